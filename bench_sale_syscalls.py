@@ -0,0 +1,142 @@
+# bench_sale_syscalls.py
+# Counts the filesystem calls one recorded sale costs, with the old
+# per-call path checks and full-file rewrites versus the memoized
+# resolver and the storage engines.
+#
+#   python bench_sale_syscalls.py > bench_output.txt
+import os
+import io
+import sys
+import json
+import shutil
+import builtins
+import tempfile
+from collections import Counter
+
+DATA_DIR = tempfile.mkdtemp(prefix="invoiceapp-bench-")
+os.environ["INVOICEAPP_DATA_DIR"] = DATA_DIR
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils import paths  # noqa: E402
+from utils.storage import open_storage, ENGINES  # noqa: E402
+
+SAMPLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "user_data")
+SALE = {
+    "buyer": "bench",
+    "product": "Book",
+    "quantity": 1,
+    "total_price": 2000.0,
+    "amount_paid": 1500.0,
+    "debt": 500.0,
+    "date": "2025-10-06 16:20:11",
+}
+
+# ------------------ Call Counter ------------------
+calls = Counter()
+PRIMITIVES = {
+    "stat": (os, "stat"),
+    "mkdir": (os, "mkdir"),
+    "open": (builtins, "open"),
+    "replace": (os, "replace"),
+    "remove": (os, "remove"),
+    "fsync": (os, "fsync"),
+}
+
+
+def counting(name, func):
+    def wrapper(*args, **kwargs):
+        calls[name] += 1
+        return func(*args, **kwargs)
+    return wrapper
+
+
+def install_counters():
+    originals = {}
+    for name, (module, attr) in PRIMITIVES.items():
+        originals[name] = getattr(module, attr)
+        setattr(module, attr, counting(name, originals[name]))
+    io.open = builtins.open
+    return originals
+
+
+def remove_counters(originals):
+    for name, (module, attr) in PRIMITIVES.items():
+        setattr(module, attr, originals[name])
+    io.open = builtins.open
+
+
+def measure(label, func):
+    reset_data()
+    calls.clear()
+    originals = install_counters()
+    try:
+        func()
+    finally:
+        remove_counters(originals)
+    total = sum(calls.values())
+    detail = ", ".join(f"{k}={v}" for k, v in sorted(calls.items()))
+    print(f"{label:<34} {total:>4} calls  ({detail})")
+
+
+def reset_data():
+    shutil.rmtree(DATA_DIR, ignore_errors=True)
+    os.makedirs(DATA_DIR)
+    for filename in paths.JSON_FILES:
+        shutil.copy(os.path.join(SAMPLE_DIR, filename), DATA_DIR)
+    with open(os.path.join(DATA_DIR, "goods.json"), "w", encoding="utf-8") as f:
+        json.dump({"Book": {"price": 2000.0, "quantity": 10}}, f)
+    paths.reset_layout()
+
+
+# ------------------ Sale Flows ------------------
+def legacy_sale():
+    """record_sale before: every get_file_path re-ran ensure_all_files()."""
+    def get_file_path(filename):
+        paths.ensure_all_files(force=True)
+        return os.path.join(paths.USERDATA_PATH, filename)
+
+    for filename, key in (("goods.json", None), ("transactions.json", "sales"), ("debts.json", "debts")):
+        path = get_file_path(filename)
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if key:
+            data.setdefault(key, []).append(dict(SALE))
+        else:
+            data["Book"]["quantity"] -= 1
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=4)
+
+
+def resolver_only(calls_per_sale=6):
+    """Path lookups alone, once the layout has been checked."""
+    paths.get_file_path("goods.json")
+    calls.clear()
+    for filename in ("goods.json", "transactions.json", "debts.json") * (calls_per_sale // 3):
+        paths.get_file_path(filename)
+
+
+def engine_sale(engine):
+    def run():
+        storage = open_storage(paths.get_file_path(), engine)
+        goods = storage.load("goods.json")
+        calls.clear()  # engine start-up is paid once per process, not per sale
+        product = dict(goods["Book"], quantity=goods["Book"]["quantity"] - 1)
+        with storage.transaction() as tx:
+            tx.put_product("Book", product)
+            tx.append("transactions.json", dict(SALE))
+            tx.append("debts.json", dict(SALE, history=[{"date": SALE["date"], "paid": 1500.0}]))
+        sale_calls = Counter(calls)
+        storage.close()
+        calls.clear()
+        calls.update(sale_calls)
+    return run
+
+
+if __name__ == "__main__":
+    print("=== FILESYSTEM CALLS PER SALE ===\n")
+    measure("before: legacy record_sale", legacy_sale)
+    measure("after: 6 memoized path lookups", resolver_only)
+    for engine in ENGINES:
+        measure(f"after: {engine} engine commit", engine_sale(engine))
+    print("\n(sqlite counts exclude the library's own I/O, which is one WAL append + fsync)")
+    shutil.rmtree(DATA_DIR, ignore_errors=True)
@@ -21,7 +21,7 @@ version = 1.0.0
 main.py
 
 # (list) Application requirements
-requirements = python3,kivy,pillow,requests
+requirements = python3,kivy,pillow,requests,sqlite3
 
 # (str) Presplash and icon
 icon.filename = assets/icons/product.png
@@ -1,22 +1,42 @@
 import os
 import sys
 import json
-from kivy.app import App
-from kivy.uix.screenmanager import ScreenManager
-from kivy.core.window import Window
+
+# ✅ Imported first so the startup timeline covers everything below
+from utils.startup import timeline
+
+with timeline.step("import kivy"):
+    from kivy.app import App
+    from kivy.clock import Clock
+    from kivy.core.window import Window
 
 # -------------------- Helpers --------------------
-from utils.paths import get_file_path, get_export_path
+with timeline.step("import utils"):
+    from utils.paths import get_file_path, get_export_path, THUMBNAILS_PATH
+    from utils.storage import open_storage, ensure_ids, CorruptDataError
+    from utils.datastore import DataStore
+    from utils.thumbnails import ThumbnailCache
+    from utils.exports import ExportQueue
+    from screens.lazy import LazyScreenManager
 
 # -------------------- Screens --------------------
-from screens.home import HomeScreen
-from screens.add_product import AddProductScreen
-from screens.view_product import ViewProductScreen
-from screens.record_sales import RecordSalesScreen
-from screens.view_transactions import ViewTransactionsScreen
-from screens.debts import DebtsScreen
-from screens.view_single_transaction import ViewSingleTransactionScreen
-from screens.product_details import ProductDetailsScreen  # ✅ product details screen
+# name -> "module:Class". Only home is built in build(); the others are
+# imported and built on first navigation, or pre-warmed after the first frame.
+SCREENS = {
+    "home": "screens.home:HomeScreen",
+    "add_product": "screens.add_product:AddProductScreen",
+    "view_product": "screens.view_product:ViewProductScreen",
+    "record_sales": "screens.record_sales:RecordSalesScreen",
+    "view_debts": "screens.debts:DebtsScreen",
+    "view_transactions": "screens.view_transactions:ViewTransactionsScreen",
+    "view_single_transaction": "screens.view_single_transaction:ViewSingleTransactionScreen",
+    "product_details": "screens.product_details:ProductDetailsScreen",
+}
+
+# Build the other screens in idle frames after start-up (INVOICEAPP_PREWARM=0 to disable)
+PREWARM = os.environ.get("INVOICEAPP_PREWARM", "1") != "0"
+PREWARM_DELAY = 1.0
+STARTUP_TIMELINE = "startup_timeline.txt"
 
 # -------------------- Required JSON --------------------
 REQUIRED_JSON = ["debts.json", "goods.json", "transactions.json"]
@@ -44,50 +64,87 @@ class InvoiceApp(App):
                 with open(path, "w", encoding="utf-8") as f:
                     json.dump({}, f, indent=4)
 
+        # ✅ Open storage engine (sqlite by default, remembered in storage.json; see utils/storage.py)
+        with timeline.step("open storage"):
+            self.storage = open_storage(self._data_dir)
+            print(f"[INFO] Storage engine: {self.storage.name}")
+            ensure_ids(self.storage)
+
+        # ✅ Shared in-memory cache of goods / sales / debts for all screens
+        self.store = DataStore(self.storage)
+
+        # ✅ Product photo thumbnails, made in background workers
+        self.thumbnails = ThumbnailCache(THUMBNAILS_PATH)
+
+        # ✅ Image / CSV exports run here, off the UI thread
+        self.exports = ExportQueue()
+
+        # ✅ History pages are built on a worker of their own, never queued behind an export
+        self.pages = ExportQueue(workers=1, name="pages")
+
+        # ✅ Human-readable JSON copies are refreshed only after the data changes
+        self._exported = self._signatures()
+
         # ✅ Assign helper methods
         self.load_json = self._load_json
         self.save_json = self._save_json
 
-        # ✅ Screen Manager setup
-        sm = ScreenManager()
-        sm.add_widget(HomeScreen(name="home"))
-        sm.add_widget(AddProductScreen(name="add_product"))
-        sm.add_widget(ViewProductScreen(name="view_product"))
-        sm.add_widget(RecordSalesScreen(name="record_sales"))
-        sm.add_widget(DebtsScreen(name="view_debts"))
-        sm.add_widget(ViewTransactionsScreen(name="view_transactions"))
-        sm.add_widget(ViewSingleTransactionScreen(name="view_single_transaction"))
-        sm.add_widget(ProductDetailsScreen(name="product_details"))  # ✅ added details screen
+        # ✅ Screen Manager setup: home now, the rest on first use
+        sm = LazyScreenManager()
+        for name, target in SCREENS.items():
+            sm.register(name, target, eager=(name == "home"))
 
+        Clock.schedule_once(lambda dt: self._first_frame(sm))
         return sm
 
+    def _first_frame(self, sm):
+        timeline.mark("first frame")
+        timeline.dump(os.path.join(self._data_dir, STARTUP_TIMELINE))
+        if PREWARM:
+            Clock.schedule_once(sm.prewarm, PREWARM_DELAY)
+
     # -------------------- JSON Utilities --------------------
     def _load_json(self, filename, default=None):
-        """Safely load JSON data."""
-        path = get_file_path(filename)
-        if not os.path.exists(path):
-            data = default or {}
-            self._save_json(filename, data)
-            return data
+        """Safely load data through the storage engine."""
         try:
-            with open(path, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except Exception as e:
-            print(f"[WARNING] Corrupted JSON at {path}: {e}. Resetting...")
+            return self.storage.load(filename, default or {})
+        except CorruptDataError as e:
+            print(f"[WARNING] Corrupted data: {e}. Resetting...")
             data = default or {}
             self._save_json(filename, data)
             return data
 
     def _save_json(self, filename, data):
-        """Safely write JSON data."""
-        path = get_file_path(filename)
+        """Safely write data through the storage engine."""
         try:
-            os.makedirs(os.path.dirname(path), exist_ok=True)
-            with open(path, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=4, ensure_ascii=False)
+            self.storage.save(filename, data)
         except Exception as e:
             print(f"[ERROR] Failed to save {filename}: {e}")
 
+    # -------------------- JSON Copies --------------------
+    def _signatures(self):
+        return [self.storage.signature(filename) for filename in REQUIRED_JSON]
+
+    def export_copies(self):
+        """Keep human-readable JSON next to binary / SQLite data, written on the export worker."""
+        signatures = self._signatures()
+        if signatures == self._exported:
+            return  # nothing changed since the last copies
+        self._exported = signatures
+        self.exports.submit(self.storage.export_json, lambda result: None)
+
+    def on_pause(self):
+        # Android may end a paused app without on_stop()
+        self.export_copies()
+        return True
+
+    def on_stop(self):
+        self.export_copies()
+        self.thumbnails.close()
+        self.pages.close()
+        self.exports.close()  # lets the copies finish writing
+        self.storage.close()
+
     # -------------------- Platform Check --------------------
     def _is_android(self):
         """Check if running on Android (Termux/Pydroid)."""
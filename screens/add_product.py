@@ -5,8 +5,8 @@ from kivy.uix.label import Label
 from kivy.uix.textinput import TextInput
 from kivy.uix.button import Button
 from kivy.app import App
+from utils.datastore import thaw
 
-GOODS_JSON = "goods.json"
 
 class AddProductScreen(Screen):
     def __init__(self, **kwargs):
@@ -45,15 +45,9 @@ class AddProductScreen(Screen):
         btn_back.bind(on_release=self.go_back)
 
     # ------------------ JSON Helpers ------------------
-    def load_goods(self):
-        """Load goods safely using App helper"""
-        app = App.get_running_app()
-        return app.load_json(GOODS_JSON, default={})
-
-    def save_goods(self, goods):
-        """Save goods safely using App helper"""
-        app = App.get_running_app()
-        app.save_json(GOODS_JSON, goods)
+    def save_one(self, name, product):
+        """Insert or update a single product"""
+        App.get_running_app().storage.put_product(name, product)
 
     # ------------------ Navigation ------------------
     def go_back(self, instance):
@@ -85,26 +79,26 @@ class AddProductScreen(Screen):
             return
 
         try:
-            goods = self.load_goods()
+            store = App.get_running_app().store
 
-            # Case-insensitive key lookup
-            existing_key = next((k for k in goods if k.lower() == name.lower()), None)
+            # Case/space-insensitive key lookup (shared product index)
+            existing_key = store.product_index().lookup(name)
 
             if existing_key:
-                product = goods[existing_key]
+                product = thaw(store.goods()[existing_key])
                 product['quantity'] = product.get('quantity', 0) + quantity
                 product['price'] = price
                 if description:
                     product['description'] = description
+                self.save_one(existing_key, product)
             else:
-                goods[name] = {
+                self.save_one(name, {
                     'price': price,
                     'quantity': quantity,
                     'description': description,
                     'image_path': ""
-                }
+                })
 
-            self.save_goods(goods)
             self._clear_inputs()
             self._show_message(f"✅ Product '{name}' saved successfully!")
 
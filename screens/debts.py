@@ -1,7 +1,6 @@
 # screens/debts.py
-import json
 from datetime import datetime
-from PIL import Image as PILImage, ImageDraw, ImageFont
+from kivy.app import App
 from kivy.metrics import dp, sp
 from kivy.uix.screenmanager import Screen
 from kivy.uix.label import Label
@@ -11,16 +10,62 @@ from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.scrollview import ScrollView
 from kivy.uix.gridlayout import GridLayout
 from kivy.uix.popup import Popup
-from kivy.graphics import Color, RoundedRectangle
-from utils.paths import get_file_path, get_export_path
+from utils.paths import get_export_path
+from utils.datastore import thaw
+from utils import receipt
+from screens.widgets import Card, CardPool
+from screens.exporting import ExportPopup
+
+DEBTS_FILE = "debts.json"
+HIDDEN_KEYS = ("history", "id", "sale_id")  # not shown in details / exports
+
+
+def debt_key(debt):
+    """Row cache key: the debt id (older records without one fall back to buyer/product/date)."""
+    return debt.get("id") or (debt.get("buyer"), debt.get("product"), debt.get("date"))
+
+
+# -------------------- Debt Row --------------------
+class DebtRow(Card):
+    """One debtor row. Patched in place while its debt is open, then pooled for the next one."""
+
+    def __init__(self, screen, debt=None, **kwargs):
+        super().__init__(
+            size_hint_y=None, height=dp(70), spacing=dp(10), padding=dp(10),
+            background=(0.15,0.15,0.2,1), radius=[10], **kwargs
+        )
+        self.debt = debt
+
+        self.label = Label(halign="left", valign="middle", font_size=sp(16), color=(1,1,1,1))
+        self.label.bind(size=self.label.setter("text_size"))
+        self.add_widget(self.label)
+
+        btn_view = Button(text="View", size_hint=(None,1), width=dp(80))
+        btn_view.bind(on_release=lambda inst: screen.open_debt_popup(self.debt))
+        self.add_widget(btn_view)
+
+        btn_update = Button(text="Update", size_hint=(None,1), width=dp(80))
+        btn_update.bind(on_release=lambda inst: screen.pay_debt_popup(self.debt))
+        self.add_widget(btn_update)
+
+        if debt is not None:
+            self.set_debt(debt)
+
+    def set_debt(self, debt):
+        self.debt = debt
+        text = f"{debt.get('buyer','Unknown')} | {debt.get('product','N/A')} | ₦{debt.get('debt',0):.2f}"
+        if self.label.text != text:
+            self.label.text = text
 
-DEBTS_FILE = get_file_path("debts.json")
 
 class DebtsScreen(Screen):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.all_debts = []
         self.filtered_debts = []
+        self.rows = {}          # debt_key -> DebtRow
+        self.row_pool = CardPool(lambda: DebtRow(self))  # rows of settled debts, reused for new ones
+        self._source = None     # store.debts() the rows were synced from
 
         self.layout = BoxLayout(orientation="vertical", spacing=dp(10), padding=dp(10))
         self.add_widget(self.layout)
@@ -45,6 +90,7 @@ class DebtsScreen(Screen):
         self.grid.bind(minimum_height=self.grid.setter("height"))
         self.scroll.add_widget(self.grid)
         self.layout.add_widget(self.scroll)
+        self.empty_label = Label(text="No unsettled debts found.", size_hint_y=None, height=dp(40))
 
         # Back button
         btn_back = Button(text="⬅ Back", size_hint=(1,0.1), font_size=sp(16))
@@ -55,78 +101,57 @@ class DebtsScreen(Screen):
     def on_pre_enter(self):
         self.load_debts()
 
-    # -------------------- JSON Helpers --------------------
-    def load_json(self):
+    # -------------------- Storage Helpers --------------------
+    def save_debt(self, debt):
+        """Write back the one debt record, matched by its id."""
         try:
-            with open(DEBTS_FILE, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except Exception as e:
-            print(f"[ERROR] Loading debts.json: {e}")
-            return {"debts": []}
-
-    def save_json(self, data):
-        with open(DEBTS_FILE, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=4)
-
-    def save_debts(self):
-        data = self.load_json()
-        existing = data.get("debts", [])
-        for debt in self.all_debts:
-            for i, d in enumerate(existing):
-                if (
-                    d["buyer"] == debt["buyer"]
-                    and d["product"] == debt["product"]
-                    and d["date"] == debt["date"]
-                ):
-                    existing[i] = debt
-                    break
-            else:
-                existing.append(debt)
-        data["debts"] = existing
-        self.save_json(data)
+            App.get_running_app().storage.update_record(DEBTS_FILE, debt)
+        except KeyError:
+            print(f"[ERROR] Debt {debt.get('id')} not found in {DEBTS_FILE}")
 
     # -------------------- Load & Display --------------------
     def load_debts(self):
-        data = self.load_json()
-        self.all_debts = [d for d in data.get("debts", []) if d.get("debt", 0) > 0]
-        self.filtered_debts = self.all_debts[:]
-        self.display_debts()
+        debts = App.get_running_app().store.debts()
+        if debts is self._source:
+            return  # nothing changed since the rows were built
+        self._source = debts
+        self.all_debts = [thaw(d) for d in debts if d.get("debt", 0) > 0]
+
+        # ✅ Patch the row cache: keep rows of known debts, build only new ones
+        rows = {}
+        for debt in self.all_debts:
+            key = debt_key(debt)
+            row = self.rows.get(key)
+            if not row:
+                row = self.row_pool.take()
+            row.set_debt(debt)
+            rows[key] = row
+        for key, row in self.rows.items():
+            if key not in rows:
+                self.row_pool.release(row)
+        self.rows = rows
+        self.filter_debts(self.search_input, self.search_input.text)
 
     def display_debts(self):
-        self.grid.clear_widgets()
-        if not self.filtered_debts:
-            self.grid.add_widget(Label(text="No unsettled debts found.", size_hint_y=None, height=dp(40)))
+        """Show the rows of filtered_debts, adding and removing only the rows that change."""
+        wanted = [self.rows[debt_key(d)] for d in self.filtered_debts]
+        if not wanted:
+            wanted = [self.empty_label]
+        shown = list(reversed(self.grid.children))  # top to bottom
+        if shown == wanted:
             return
 
-        for debt in self.filtered_debts:
-            row = BoxLayout(size_hint_y=None, height=dp(70), spacing=dp(10), padding=dp(10))
-            with row.canvas.before:
-                Color(0.15,0.15,0.2,1)
-                rect = RoundedRectangle(pos=row.pos, size=row.size, radius=[10])
-            row.bg_rect = rect
-            row.bind(pos=self.update_rect, size=self.update_rect)
-
-            label = Label(
-                text=f"{debt.get('buyer','Unknown')} | {debt.get('product','N/A')} | ₦{debt.get('debt',0):.2f}",
-                halign="left", valign="middle", font_size=sp(16), color=(1,1,1,1)
-            )
-            label.bind(size=label.setter("text_size"))
-            row.add_widget(label)
-
-            btn_view = Button(text="View", size_hint=(None,1), width=dp(80))
-            btn_view.bind(on_release=lambda inst, d=debt: self.open_debt_popup(d))
-            row.add_widget(btn_view)
-
-            btn_update = Button(text="Update", size_hint=(None,1), width=dp(80))
-            btn_update.bind(on_release=lambda inst, d=debt: self.pay_debt_popup(d))
-            row.add_widget(btn_update)
-
-            self.grid.add_widget(row)
-
-    def update_rect(self, instance, value):
-        if hasattr(instance, "bg_rect"):
-            instance.bg_rect.pos = instance.pos
-            instance.bg_rect.size = instance.size
+        keep = {id(widget) for widget in wanted}
+        for widget in shown:
+            if id(widget) not in keep:
+                self.grid.remove_widget(widget)
+        for position, widget in enumerate(wanted):
+            children = self.grid.children
+            if len(children) > position and children[-1 - position] is widget:
+                continue
+            if widget.parent:
+                self.grid.remove_widget(widget)
+            self.grid.add_widget(widget, index=len(self.grid.children) - position)
 
     # -------------------- Search --------------------
     def filter_debts(self, instance, text):
@@ -140,7 +165,7 @@ class DebtsScreen(Screen):
     def open_debt_popup(self, debt):
         layout = BoxLayout(orientation="vertical", padding=dp(10), spacing=dp(10))
         for key, value in debt.items():
-            if key != "history":
+            if key not in HIDDEN_KEYS:
                 layout.add_widget(Label(text=f"{key.capitalize()}: {value}", size_hint_y=None, height=dp(30), font_size=sp(14)))
 
         for text, action in [
@@ -187,12 +212,22 @@ class DebtsScreen(Screen):
                 "paid": amount
             })
 
-            if debt["debt"] <= 0 and debt in self.all_debts:
-                self.all_debts.remove(debt)
-
-            self.filtered_debts = self.all_debts[:]
-            self.save_debts()
-            self.display_debts()
+            self.save_debt(debt)
+
+            # ✅ Patch just this debt's row: drop it once settled, else refresh its balance
+            row = self.rows.get(debt_key(debt))
+            if debt["debt"] <= 0:
+                if debt in self.all_debts:
+                    self.all_debts.remove(debt)
+                if debt in self.filtered_debts:
+                    self.filtered_debts.remove(debt)
+                self.rows.pop(debt_key(debt), None)
+                if row:
+                    self.row_pool.release(row)  # off the grid, kept for the next new debt
+                if not self.filtered_debts:
+                    self.display_debts()
+            elif row:
+                row.set_debt(debt)
             popup.dismiss()
 
         btn_pay.bind(on_release=process_payment)
@@ -219,30 +254,12 @@ class DebtsScreen(Screen):
         filename = f"debt_{datetime.now().strftime('%Y%m%d%H%M%S')}.png"
         filepath = f"{export_folder}/{filename}"
 
-        img = PILImage.new("RGB", (700, 400), color=(30, 30, 30))
-        draw = ImageDraw.Draw(img)
-        y = 20
-        try:
-            font = ImageFont.truetype("arial.ttf", 18)
-        except:
-            font = ImageFont.load_default()
-
-        for key, value in debt.items():
-            if key != "history":
-                draw.text((20, y), f"{key.capitalize()}: {value}", fill="white", font=font)
-                y += 30
-
-        history = debt.get("history", [])
-        if history:
-            draw.text((20, y), "Payment History:", fill="white", font=font)
-            y += 25
-            for record in history:
-                draw.text((20, y), f"{record['date']} → ₦{record['paid']:.2f}", fill="white", font=font)
-                y += 25
-
-        img.save(filepath)
-        popup = Popup(title="Exported Image", content=Label(text=f"Debt exported to:\n{filepath}"), size_hint=(0.8,0.4))
-        popup.open()
+        # ✅ Rendered in an export worker from a snapshot of the lines
+        lines = receipt.debt_lines(debt, HIDDEN_KEYS)
+        ExportPopup("Exported Image").run(
+            lambda: receipt.export_png(lines, receipt.DEBT_STYLE, filepath),
+            f"Debt exported to:\n{filepath}",
+        )
 
     # -------------------- Navigation --------------------
     def go_back(self, *args):
@@ -0,0 +1,63 @@
+# screens/exporting.py
+from io import BytesIO
+
+from kivy.app import App
+from kivy.clock import Clock
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.scrollview import ScrollView
+from kivy.uix.label import Label
+from kivy.uix.button import Button
+from kivy.uix.popup import Popup
+from kivy.uix.image import Image as KivyImage
+from kivy.core.image import Image as CoreImage
+
+
+class ExportPopup(Popup):
+    """Shows "Exporting..." while a job runs on app.exports, then the result or the error."""
+
+    def __init__(self, title, **kwargs):
+        super().__init__(title=title, size_hint=(0.8, 0.4), **kwargs)
+        self.status = Label(text="Exporting", halign="center", valign="middle")
+        self.status.bind(size=self.status.setter('text_size'))
+        self.content = self.status
+        self._dots = 0
+        self._ticker = Clock.schedule_interval(self._tick, 0.3)
+        self.bind(on_dismiss=lambda *_: self._ticker.cancel())
+
+    def _tick(self, dt):
+        self._dots = (self._dots + 1) % 4
+        self.status.text = "Exporting" + "." * self._dots
+
+    def run(self, job, done_message, preview=False):
+        """
+        Open, run `job` in the background and show `done_message` (and the
+        PNG it returned if preview). `done_message` may also be a function
+        of the job's result.
+        """
+        self.open()
+        App.get_running_app().exports.submit(
+            job,
+            lambda result: self.finish(
+                done_message(result) if callable(done_message) else done_message,
+                result if preview else None,
+            ),
+            lambda error: self.finish(f"Export failed:\n{error}"),
+        )
+
+    def finish(self, message, png=None):
+        self._ticker.cancel()
+        layout = BoxLayout(orientation='vertical', spacing=10, padding=10)
+        if png:
+            # ✅ Preview from the bytes that were written, no second encode
+            texture = CoreImage(BytesIO(png), ext='png').texture
+            scroll = ScrollView()
+            scroll.add_widget(KivyImage(texture=texture, allow_stretch=True, keep_ratio=True))
+            layout.add_widget(scroll)
+            self.size_hint = (0.9, 0.9)
+        lbl = Label(text=message, halign="center", valign="middle", size_hint_y=None if png else 1, height=60)
+        lbl.bind(size=lbl.setter('text_size'))
+        layout.add_widget(lbl)
+        btn_close = Button(text="Close", size_hint_y=None, height=40)
+        btn_close.bind(on_release=self.dismiss)
+        layout.add_widget(btn_close)
+        self.content = layout
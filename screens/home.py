@@ -7,11 +7,10 @@ from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.gridlayout import GridLayout
 from kivy.uix.label import Label
 from kivy.uix.image import Image
-from kivy.uix.behaviors import ButtonBehavior
-from kivy.graphics import Color, RoundedRectangle
 from kivy.metrics import dp, sp
 
 from utils.paths import get_file_path  # future-proof file path handling
+from screens.widgets import ClickableCard
 
 # Base assets directory
 BASE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assets", "icons")
@@ -24,22 +23,17 @@ def get_icon(filename):
     return path
 
 # ---------------- IconButton ----------------
-class IconButton(ButtonBehavior, BoxLayout):
+class IconButton(ClickableCard):
     def __init__(self, icon_path, text, **kwargs):
-        super().__init__(orientation='vertical', spacing=dp(5), padding=dp(8), **kwargs)
+        super().__init__(
+            orientation='vertical', spacing=dp(5), padding=dp(8),
+            background=(0.2, 0.5, 0.8, 1), pressed_background=(0.1, 0.4, 0.7, 1),
+            **kwargs
+        )
         self.icon_path = icon_path
         self.text = text
         self.size_hint = (1, 1)
-        self.radius = [dp(12)]
-        self.bg_color = (0.2, 0.5, 0.8, 1)
-        self.pressed_color = (0.1, 0.4, 0.7, 1)
-        self.current_color = self.bg_color
-
-        # Background
-        with self.canvas.before:
-            Color(rgba=self.current_color)
-            self.rect = RoundedRectangle(size=self.size, pos=self.pos, radius=self.radius)
-        self.bind(pos=self.update_rect, size=self.update_rect)
+        # ✅ Background comes from Card; pressing recolours it in place
 
         # Icon
         self.image = Image(
@@ -62,24 +56,6 @@ class IconButton(ButtonBehavior, BoxLayout):
         self.add_widget(self.image)
         self.add_widget(self.label)
 
-    def update_rect(self, *args):
-        self.rect.pos = self.pos
-        self.rect.size = self.size
-
-    def on_press(self):
-        self.current_color = self.pressed_color
-        self.update_canvas()
-
-    def on_release(self):
-        self.current_color = self.bg_color
-        self.update_canvas()
-
-    def update_canvas(self):
-        self.canvas.before.clear()
-        with self.canvas.before:
-            Color(rgba=self.current_color)
-            self.rect = RoundedRectangle(size=self.size, pos=self.pos, radius=self.radius)
-
 # ---------------- Home Screen ----------------
 class HomeScreen(Screen):
     def __init__(self, **kwargs):
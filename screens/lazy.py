@@ -0,0 +1,56 @@
+# screens/lazy.py
+from importlib import import_module
+
+from kivy.clock import Clock
+from kivy.uix.screenmanager import ScreenManager, Screen
+
+from utils.startup import timeline
+
+
+class LazyScreenManager(ScreenManager):
+    """
+    ScreenManager whose screens are registered as "module:Class" targets
+    and imported and built on first use. Until then a bare placeholder
+    Screen holds the name, so screen_names, has_screen(), get_screen()
+    and `current = name` all work as with eagerly built screens.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._targets = {}  # name -> "module:Class" not built yet
+
+    def register(self, name, target, eager=False):
+        if eager:
+            self.add_widget(self._build(name, target))
+            return
+        self._targets[name] = target
+        self.add_widget(Screen(name=name))
+
+    def is_built(self, name):
+        return name not in self._targets
+
+    def get_screen(self, name):
+        target = self._targets.pop(name, None)
+        if target is None:
+            return super().get_screen(name)
+        placeholder = super().get_screen(name)
+        screen = self._build(name, target)
+        self.remove_widget(placeholder)
+        self.add_widget(screen)
+        return screen
+
+    def _build(self, name, target):
+        module_name, class_name = target.split(":")
+        with timeline.step(f"import {module_name}"):
+            cls = getattr(import_module(module_name), class_name)
+        with timeline.step(f"build {name}"):
+            return cls(name=name)
+
+    # ------------------ Pre-warming ------------------
+    def prewarm(self, *args):
+        """Build the remaining screens while the app is idle, one per frame."""
+        if not self._targets:
+            timeline.mark("all screens built")
+            return
+        self.get_screen(next(iter(self._targets)))
+        Clock.schedule_once(self.prewarm, 0)
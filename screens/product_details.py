@@ -1,7 +1,7 @@
 # screens/product_details.py
 import os
-import json
 from datetime import datetime
+from kivy.app import App
 from kivy.uix.screenmanager import Screen
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.carousel import Carousel
@@ -12,7 +12,7 @@ from kivy.uix.popup import Popup
 from kivy.uix.textinput import TextInput
 from kivy.uix.scrollview import ScrollView
 from kivy.graphics import Color, RoundedRectangle
-from utils.paths import GOODS_JSON_PATH  # Centralized path
+from utils.datastore import thaw
 
 class ProductDetailsScreen(Screen):
     """Displays full product details, restock history, and actions."""
@@ -83,15 +83,7 @@ class ProductDetailsScreen(Screen):
 
     # ================= JSON HELPERS =================
     def _load_goods(self):
-        if os.path.exists(GOODS_JSON_PATH):
-            with open(GOODS_JSON_PATH, "r", encoding="utf-8") as f:
-                return json.load(f)
-        return {}
-
-    def _save_goods(self, data):
-        os.makedirs(os.path.dirname(GOODS_JSON_PATH), exist_ok=True)
-        with open(GOODS_JSON_PATH, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=4)
+        return App.get_running_app().store.goods()
 
     def _update_desc_height(self, instance, value):
         instance.height = instance.texture_size[1]
@@ -132,7 +124,7 @@ class ProductDetailsScreen(Screen):
             return
 
         goods = self._load_goods()
-        product = goods.get(self.current_product_name, {})
+        product = thaw(goods.get(self.current_product_name, {}))
 
         layout = BoxLayout(orientation="vertical", spacing=10, padding=10)
         qty_input = TextInput(hint_text="Enter quantity to add", input_filter="int", multiline=False)
@@ -172,8 +164,7 @@ class ProductDetailsScreen(Screen):
                 "note": f"{old_qty}→{old_qty+qty}, ₦{old_price}→₦{price}"
             }
             product.setdefault("history", []).append(entry)
-            goods[self.current_product_name] = product
-            self._save_goods(goods)
+            App.get_running_app().storage.put_product(self.current_product_name, product)
             self.load_product(self.current_product_name)
             popup.dismiss()
 
@@ -1,5 +1,6 @@
-import json
 from datetime import datetime
+from kivy.app import App
+from kivy.clock import Clock
 from kivy.uix.screenmanager import Screen
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.label import Label
@@ -8,13 +9,19 @@ from kivy.uix.button import Button
 from kivy.uix.popup import Popup
 from kivy.uix.scrollview import ScrollView
 from kivy.uix.gridlayout import GridLayout
-from utils.paths import get_file_path  # ✅ Use paths helper
+from utils.datastore import thaw
+from utils.storage import new_id
+
+SEARCH_DELAY = 0.15     # seconds of typing pause before the product list updates
+MAX_RESULTS = 100       # result buttons shown at once
 
 
 class RecordSalesScreen(Screen):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.selected_product = None
+        self.product_popup = None
+        self._result_buttons = []   # reused between searches and openings
 
         layout = BoxLayout(orientation='vertical', padding=20, spacing=10)
         layout.add_widget(Label(text="Record Sales", font_size=22, size_hint=(1, 0.15)))
@@ -49,77 +56,89 @@ class RecordSalesScreen(Screen):
         btn_view_transactions.bind(on_release=lambda x: self.goto_screen('view_transactions'))
         btn_back.bind(on_release=lambda x: self.goto_screen('home'))
 
-    # ------------------ JSON Helpers ------------------
-    def load_json(self, path, default=None):
-        default = default or {}
-        try:
-            with open(path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                return data if isinstance(data, dict) else default
-        except Exception:
-            return default
-
-    def save_json(self, path, data):
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=4)
-
     # ------------------ Products ------------------
-    def load_products(self):
-        goods_path = get_file_path("goods.json")
-        goods = self.load_json(goods_path, default={})
-        self.products = [
-            {"key": k, "name": k, "price": v.get("price", 0), "quantity": v.get("quantity", 0)}
-            for k, v in goods.items()
-        ]
-        return self.products
-
     def _on_product_input_touch(self, instance, touch):
         if instance.collide_point(*touch.pos):
             self.open_product_popup()
             return True
         return False
 
-    def open_product_popup(self):
-        self.load_products()
+    def build_product_popup(self):
+        """Built once; later openings only reset the search."""
         popup_layout = BoxLayout(orientation='vertical', spacing=10, padding=10)
 
-        search_input = TextInput(hint_text="Search product", multiline=False, size_hint_y=None, height=40)
+        self.popup_search = TextInput(hint_text="Search product", multiline=False, size_hint_y=None, height=40)
+        self._search_trigger = Clock.create_trigger(self.populate_results, SEARCH_DELAY)
+        self.popup_search.bind(text=lambda inst, val: self._search_trigger())
         scroll = ScrollView()
-        grid = GridLayout(cols=1, spacing=10, size_hint_y=None)
-        grid.bind(minimum_height=grid.setter('height'))
-        scroll.add_widget(grid)
+        self.results_grid = GridLayout(cols=1, spacing=10, size_hint_y=None)
+        self.results_grid.bind(minimum_height=self.results_grid.setter('height'))
+        scroll.add_widget(self.results_grid)
+        self.results_note = Label(size_hint_y=None, height=40)
 
-        popup_layout.add_widget(search_input)
+        popup_layout.add_widget(self.popup_search)
         popup_layout.add_widget(scroll)
 
-        popup = Popup(title="Select Product", content=popup_layout, size_hint=(0.9, 0.8))
-
-        def populate_grid(filter_text=""):
-            grid.clear_widgets()
-            for product in self.products:
-                if filter_text.lower() in product['name'].lower():
-                    btn = Button(
-                        text=f"{product['name']} - ₦{product['price']}",
-                        size_hint_y=None, height=40
-                    )
-                    btn.bind(on_release=lambda inst, p=product: select_product(p))
-                    grid.add_widget(btn)
-
-        def select_product(product):
-            self.selected_product = product
-            self.product_input.text = product['name']
-            self.product_price_label.text = f"Product Price: ₦{product['price']:.2f}"
-            self.update_amount_due()
-            popup.dismiss()
-
-        search_input.bind(text=lambda inst, val: populate_grid(val))
-
         btn_back_popup = Button(text="Back", size_hint_y=None, height=40)
-        btn_back_popup.bind(on_release=lambda x: popup.dismiss())
         popup_layout.add_widget(btn_back_popup)
 
-        populate_grid()
-        popup.open()
+        self.product_popup = Popup(title="Select Product", content=popup_layout, size_hint=(0.9, 0.8))
+        btn_back_popup.bind(on_release=lambda x: self.product_popup.dismiss())
+
+    def open_product_popup(self):
+        if self.product_popup is None:
+            self.build_product_popup()
+        self.popup_search.text = ""
+        self._search_trigger.cancel()
+        self.populate_results()
+        self.product_popup.open()
+
+    def populate_results(self, *args):
+        """Show the products matching the search, reusing pooled buttons."""
+        store = App.get_running_app().store
+        goods = store.goods()
+        keys = store.product_search().search(self.popup_search.text)
+        shown = keys[:MAX_RESULTS]
+
+        while len(self._result_buttons) < len(shown):
+            btn = Button(size_hint_y=None, height=40)
+            btn.bind(on_release=self.select_product)
+            self._result_buttons.append(btn)
+        for btn, key in zip(self._result_buttons, shown):
+            btn.product_key = key
+            btn.text = f"{key} - ₦{goods[key].get('price', 0)}"
+
+        # ✅ Only add or remove buttons at the end of the list
+        grid = self.results_grid
+        if self.results_note.parent:
+            grid.remove_widget(self.results_note)
+        visible = len(grid.children)
+        for btn in self._result_buttons[len(shown):visible]:
+            grid.remove_widget(btn)
+        for btn in self._result_buttons[visible:len(shown)]:
+            grid.add_widget(btn)
+
+        if not keys:
+            self.results_note.text = "No products found."
+            grid.add_widget(self.results_note)
+        elif len(keys) > len(shown):
+            self.results_note.text = f"{len(keys) - len(shown)} more, keep typing to narrow down"
+            grid.add_widget(self.results_note)
+
+    def select_product(self, btn):
+        product = App.get_running_app().store.goods().get(btn.product_key)
+        if product is None:
+            return  # removed since the list was shown
+        self.selected_product = {
+            "key": btn.product_key,
+            "name": btn.product_key,
+            "price": product.get("price", 0),
+            "quantity": product.get("quantity", 0),
+        }
+        self.product_input.text = btn.product_key
+        self.product_price_label.text = f"Product Price: ₦{self.selected_product['price']:.2f}"
+        self.update_amount_due()
+        self.product_popup.dismiss()
 
     # ------------------ Amount Calculation ------------------
     def update_amount_due(self, *args):
@@ -149,17 +168,15 @@ class RecordSalesScreen(Screen):
             self.message.color = (1, 0, 0, 1)
             return
 
-        goods_path = get_file_path("goods.json")
-        goods = self.load_json(goods_path, default={})
-        product_key = next(
-            (k for k in goods if k.strip().lower() == self.selected_product['name'].strip().lower()), None
-        )
+        store = App.get_running_app().store
+        goods = store.goods()
+        product_key = store.product_index().lookup(self.selected_product['name'])
         if not product_key:
             self.message.text = "⚠️ Product not found."
             self.message.color = (1, 0, 0, 1)
             return
 
-        product = goods[product_key]
+        product = thaw(goods[product_key])
         if quantity > product.get('quantity', 0):
             self.message.text = "⚠️ Not enough stock."
             self.message.color = (1, 0, 0, 1)
@@ -169,18 +186,10 @@ class RecordSalesScreen(Screen):
         debt_amount = max(total_price - paid, 0)
         date_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-        # ✅ Update stock
+        # ✅ Stock, sale and debt are committed together
         product['quantity'] -= quantity
-        goods[product_key] = product
-        self.save_json(goods_path, goods)
-
-        # ✅ Record transaction
-        tx_path = get_file_path("transactions.json")
-        transactions = self.load_json(tx_path, default={})
-        if not isinstance(transactions, dict):
-            transactions = {}
-        transactions.setdefault("sales", [])
-        transactions["sales"].append({
+        sale = {
+            "id": new_id(),
             "buyer": buyer,
             "product": self.selected_product['name'],
             "quantity": quantity,
@@ -188,27 +197,14 @@ class RecordSalesScreen(Screen):
             "amount_paid": paid,
             "debt": debt_amount,
             "date": date_str
-        })
-        self.save_json(tx_path, transactions)
-
-        # ✅ Record debt if any
-        if debt_amount > 0:
-            debts_path = get_file_path("debts.json")
-            debts = self.load_json(debts_path, default={})
-            if not isinstance(debts, dict):
-                debts = {}
-            debts.setdefault("debts", [])
-            debts["debts"].append({
-                "buyer": buyer,
-                "product": self.selected_product['name'],
-                "quantity": quantity,
-                "total_price": total_price,
-                "amount_paid": paid,
-                "debt": debt_amount,
-                "date": date_str,
-                "history": [{"date": date_str, "paid": paid}]
-            })
-            self.save_json(debts_path, debts)
+        }
+        with App.get_running_app().storage.transaction() as tx:
+            tx.put_product(product_key, product)
+            tx.append("transactions.json", sale)
+            if debt_amount > 0:
+                tx.append("debts.json", dict(
+                    sale, id=new_id(), sale_id=sale["id"], history=[{"date": date_str, "paid": paid}]
+                ))
 
         # ✅ Reset
         self.message.text = "✅ Sale recorded successfully!"
@@ -1,5 +1,3 @@
-import os
-import json
 from kivy.app import App
 from kivy.uix.screenmanager import Screen
 from kivy.uix.boxlayout import BoxLayout
@@ -10,15 +8,71 @@ from kivy.uix.image import Image
 from kivy.uix.button import Button
 from kivy.uix.textinput import TextInput
 from kivy.graphics import Color, RoundedRectangle
-from kivy.uix.behaviors import ButtonBehavior
 from screens.product_details import ProductDetailsScreen  # ✅ Correct import
-from utils.paths import GOODS_JSON_PATH
+from screens.widgets import ClickableCard, CardPool
 
 
-# ------------------------ Clickable Card ------------------------
-class ClickableCard(ButtonBehavior, BoxLayout):
-    """Clickable product card."""
-    pass
+# ------------------------ Product Card ------------------------
+class ProductCard(ClickableCard):
+    """Clickable product card. Its widgets are made once; set_product() refills them."""
+
+    def __init__(self, screen, **kwargs):
+        super().__init__(
+            orientation="horizontal", size_hint_y=None, height=200, spacing=15, padding=10,
+            background=(0.08, 0.08, 0.08, 1), radius=[15], **kwargs
+        )
+        self.product_name = None
+        self.image_path = ""
+
+        # Product Image
+        img_box = BoxLayout(size_hint=(None, 1), width=180)
+        self.img = Image(size_hint=(None, None), size=(160, 160))
+        with self.img.canvas.before:
+            Color(0.2, 0.2, 0.2, 1)
+            self.placeholder = RoundedRectangle(size=self.img.size, pos=self.img.pos, radius=[10])
+        self.img.bind(pos=self.update_placeholder)
+        img_box.add_widget(self.img)
+
+        # Product Info
+        self.info = BoxLayout(orientation="vertical", spacing=5)
+        self.name_label = Label(markup=True, font_size=22, color=(1, 1, 1, 1))
+        self.price_label = Label(font_size=20, color=(0.8, 0.8, 0.8, 1))
+        self.stock_label = Label(font_size=18, color=(0.6, 0.9, 0.6, 1))
+        self.description_label = Label(font_size=16, color=(0.7, 0.7, 0.7, 1))
+        for label in (self.name_label, self.price_label, self.stock_label):
+            self.info.add_widget(label)
+
+        self.add_widget(img_box)
+        self.add_widget(self.info)
+        self.bind(on_release=lambda inst: screen.open_product_details(self.product_name))
+
+    def update_placeholder(self, instance, pos):
+        self.placeholder.pos = pos
+
+    def set_product(self, name, data, thumbnails):
+        self.product_name = name
+        self.name_label.text = f"[b]{name}[/b]"
+        self.price_label.text = f"₦{data.get('price', 0)}"
+        self.stock_label.text = f"{data.get('quantity', 0)} in stock"
+
+        description = data.get("description", "")
+        self.description_label.text = description
+        if description and not self.description_label.parent:
+            self.info.add_widget(self.description_label)
+        elif not description and self.description_label.parent:
+            self.info.remove_widget(self.description_label)
+
+        image_path = data.get("image_path", "")
+        if image_path != self.image_path:
+            self.image_path = image_path
+            self.img.texture = None
+            if image_path:
+                # ✅ Thumbnail comes from the cache or a worker; the placeholder shows until then
+                thumbnails.request(image_path, lambda texture, path=image_path: self.show_thumbnail(path, texture))
+
+    def show_thumbnail(self, path, texture):
+        if path == self.image_path:  # the card may show another product by now
+            self.img.texture = texture
 
 
 # ------------------------ View Product Screen ------------------------
@@ -65,18 +119,11 @@ class ViewProductScreen(Screen):
 
         # Storage for products
         self.all_goods = {}
+        self.card_pool = CardPool(lambda: ProductCard(self))
 
     # ------------------ JSON Helpers ------------------
     def load_goods(self):
-        if os.path.exists(GOODS_JSON_PATH):
-            with open(GOODS_JSON_PATH, "r", encoding="utf-8") as f:
-                return json.load(f)
-        return {}
-
-    def save_goods(self, data):
-        os.makedirs(os.path.dirname(GOODS_JSON_PATH), exist_ok=True)
-        with open(GOODS_JSON_PATH, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=4)
+        return App.get_running_app().store.goods()
 
     # ------------------ Lifecycle ------------------
     def on_enter(self):
@@ -91,54 +138,19 @@ class ViewProductScreen(Screen):
         self.display_products()
 
     def display_products(self, filter_text=""):
-        self.grid.clear_widgets()
+        # ✅ Cards go back to the pool and are refilled, not rebuilt
+        self.card_pool.release_all(self.grid)
         if not self.all_goods:
             self.grid.add_widget(Label(text="No products found.", color=(1, 1, 1, 1)))
             return
 
+        thumbnails = App.get_running_app().thumbnails
         count = 0
         for name, data in self.all_goods.items():
             if filter_text and filter_text not in name.lower():
                 continue
-
-            price = data.get("price", 0)
-            quantity = data.get("quantity", 0)
-            description = data.get("description", "")
-            image_path = data.get("image_path", "")
-
-            # Clickable Product Card
-            card = ClickableCard(orientation="horizontal", size_hint_y=None, height=200, spacing=15, padding=10)
-            with card.canvas.before:
-                Color(0.08, 0.08, 0.08, 1)
-                bg_rect = RoundedRectangle(size=card.size, pos=card.pos, radius=[15])
-            card.bind(size=lambda inst, val, rect=bg_rect: setattr(rect, "size", val))
-            card.bind(pos=lambda inst, val, rect=bg_rect: setattr(rect, "pos", val))
-
-            # Product Image
-            img_box = BoxLayout(size_hint=(None, 1), width=180)
-            if image_path and os.path.exists(image_path):
-                img = Image(source=image_path, size_hint=(None, None), size=(160, 160))
-            else:
-                img = Image(size_hint=(None, None), size=(160, 160))
-                with img.canvas.before:
-                    Color(0.2, 0.2, 0.2, 1)
-                    RoundedRectangle(size=img.size, pos=img.pos, radius=[10])
-            img_box.add_widget(img)
-
-            # Product Info
-            info = BoxLayout(orientation="vertical", spacing=5)
-            info.add_widget(Label(text=f"[b]{name}[/b]", markup=True, font_size=22, color=(1, 1, 1, 1)))
-            info.add_widget(Label(text=f"₦{price}", font_size=20, color=(0.8, 0.8, 0.8, 1)))
-            info.add_widget(Label(text=f"{quantity} in stock", font_size=18, color=(0.6, 0.9, 0.6, 1)))
-            if description:
-                info.add_widget(Label(text=description, font_size=16, color=(0.7, 0.7, 0.7, 1)))
-
-            card.add_widget(img_box)
-            card.add_widget(info)
-
-            # Capture correct product in lambda using default arg
-            card.bind(on_release=lambda inst, product_name=name: self.open_product_details(product_name))
-
+            card = self.card_pool.take()
+            card.set_product(name, data, thumbnails)
             self.grid.add_widget(card)
             count += 1
 
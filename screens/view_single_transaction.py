@@ -1,7 +1,6 @@
 # screens/view_single_transaction.py
 import os
 import csv
-from io import BytesIO
 from datetime import datetime
 from kivy.uix.screenmanager import Screen
 from kivy.uix.boxlayout import BoxLayout
@@ -9,13 +8,11 @@ from kivy.uix.scrollview import ScrollView
 from kivy.uix.label import Label
 from kivy.uix.button import Button
 from kivy.uix.popup import Popup
-from kivy.uix.image import Image as KivyImage
-from kivy.core.image import Image as CoreImage
 from kivy.graphics import Color, RoundedRectangle
-from PIL import Image, ImageDraw, ImageFont
 from utils.paths import get_export_path
-
-EXPORT_PATH = get_export_path()  # Ensure this returns a valid folder path
+from utils import receipt
+from utils.exports import CSV_HEADER, sale_row
+from screens.exporting import ExportPopup
 
 class ViewSingleTransactionScreen(Screen):
     def __init__(self, **kwargs):
@@ -85,87 +82,39 @@ class ViewSingleTransactionScreen(Screen):
         self.info_label.text = info_text
 
     # ------------------ Export Functions ------------------
+    def export_filepath(self, extension):
+        export_path = get_export_path()  # resolved on use, and created again if deleted
+        safe_buyer = self.transaction['buyer'].replace(' ', '_')
+        safe_date = self.transaction['date'].replace(':','-').replace(' ','_')
+        return os.path.join(export_path, f"{safe_buyer}_{safe_date}.{extension}")
+
     def export_csv(self, instance):
         if not self.transaction:
             return
-        os.makedirs(EXPORT_PATH, exist_ok=True)
-        safe_buyer = self.transaction['buyer'].replace(' ', '_')
-        safe_date = self.transaction['date'].replace(':','-').replace(' ','_')
-        filepath = os.path.join(EXPORT_PATH, f"{safe_buyer}_{safe_date}.csv")
-
-        with open(filepath, "w", newline="", encoding="utf-8") as f:
-            writer = csv.writer(f)
-            writer.writerow([
-                "Buyer", "Product", "Quantity", "Total Price",
-                "Amount Paid", "Debt", "Date", "Payment History"
-            ])
-            history_text = "; ".join([f"{h['date']} → ₦{h['paid']:.2f}" for h in self.transaction.get("history", [])])
-            writer.writerow([
-                self.transaction["buyer"],
-                self.transaction["product"],
-                self.transaction["quantity"],
-                self.transaction.get("total_price", self.transaction["amount_paid"] + self.transaction["debt"]),
-                self.transaction["amount_paid"],
-                self.transaction["debt"],
-                self.transaction["date"],
-                history_text
-            ])
-        self.show_popup("CSV Exported", f"Transaction saved as:\n{filepath}")
+        txn = self.transaction
+        filepath = self.export_filepath("csv")
+
+        def write_csv():
+            with open(filepath, "w", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow(CSV_HEADER)
+                writer.writerow(sale_row(txn, txn.get("history", [])))
+
+        # ✅ Written by the export workers; the popup shows progress, then the result
+        ExportPopup("CSV Exported").run(write_csv, f"Transaction saved as:\n{filepath}")
 
     def export_image(self, instance):
         if not self.transaction:
             return
-        os.makedirs(EXPORT_PATH, exist_ok=True)
-        total_price = self.transaction.get("total_price", self.transaction["amount_paid"] + self.transaction["debt"])
-        info = (
-            f"Date: {self.transaction['date']}\n"
-            f"Buyer: {self.transaction['buyer']}\n"
-            f"Product: {self.transaction['product']}\n"
-            f"Quantity: {self.transaction['quantity']}\n"
-            f"Total Price: ₦{total_price:.2f}\n"
-            f"Amount Paid: ₦{self.transaction['amount_paid']:.2f}\n"
-            f"Debt: ₦{self.transaction['debt']:.2f}"
+        lines = receipt.transaction_lines(self.transaction)
+        filepath = self.export_filepath("png")
+        # ✅ Rendered and encoded once in a worker; the same PNG bytes make the preview
+        ExportPopup("Exported Image").run(
+            lambda: receipt.export_png(lines, receipt.TRANSACTION_STYLE, filepath),
+            f"Saved as:\n{filepath}",
+            preview=True,
         )
 
-        history = self.transaction.get("history", [])
-        if history:
-            info += "\nPayment History:\n"
-            for h in history:
-                info += f"{h['date']} → ₦{h['paid']:.2f}\n"
-
-        # Create PIL image
-        img_height = 250 + 30*len(history)
-        img = Image.new("RGB", (800, img_height), "white")
-        draw = ImageDraw.Draw(img)
-        try:
-            font = ImageFont.truetype("arial.ttf", 22)
-        except:
-            font = ImageFont.load_default()
-        draw.multiline_text((20, 20), info, fill="black", font=font, spacing=10)
-
-        safe_buyer = self.transaction['buyer'].replace(' ', '_')
-        safe_date = self.transaction['date'].replace(':','-').replace(' ','_')
-        filepath = os.path.join(EXPORT_PATH, f"{safe_buyer}_{safe_date}.png")
-        img.save(filepath)
-
-        # Preview in-app
-        byte_io = BytesIO()
-        img.save(byte_io, format='PNG')
-        byte_io.seek(0)
-        kivy_img = CoreImage(byte_io, ext='png').texture
-
-        popup_layout = BoxLayout(orientation='vertical', spacing=10, padding=10)
-        scroll = ScrollView()
-        image_widget = KivyImage(texture=kivy_img, allow_stretch=True, keep_ratio=True)
-        scroll.add_widget(image_widget)
-        popup_layout.add_widget(scroll)
-        close_btn = Button(text="Close", size_hint_y=None, height=40)
-        popup_layout.add_widget(close_btn)
-
-        popup = Popup(title="Exported Image", content=popup_layout, size_hint=(0.9,0.9))
-        close_btn.bind(on_release=popup.dismiss)
-        popup.open()
-
     # ------------------ Popup Helper ------------------
     def show_popup(self, title, message):
         content = BoxLayout(orientation='vertical', padding=15, spacing=10)
@@ -1,18 +1,77 @@
 # screens/view_transactions.py
-import json
+import os
+import re
+from datetime import date
+from itertools import islice
+
+from kivy.app import App
+from kivy.clock import Clock
 from kivy.uix.screenmanager import Screen
 from kivy.uix.boxlayout import BoxLayout
-from kivy.uix.scrollview import ScrollView
-from kivy.uix.gridlayout import GridLayout
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
+from kivy.uix.recycleboxlayout import RecycleBoxLayout
 from kivy.uix.label import Label
 from kivy.uix.button import Button
 from kivy.uix.textinput import TextInput
-from kivy.graphics import Color, RoundedRectangle
-from utils.paths import get_file_path  # ✅ Use same helper
+from kivy.uix.checkbox import CheckBox
+from kivy.uix.popup import Popup
+from utils.paths import get_export_path
+from utils.storage import sale_key, sale_matches
+from utils.exports import payment_histories, write_sales_csv
+from screens.exporting import ExportPopup
+from screens.widgets import Card
+
+SCREENFUL = 20  # cards shown straight from the file while the first page is built
+PAGE_SIZE = 30
+LOAD_MORE_AT = 0.1  # scroll_y (0 = bottom) at which the next page is fetched
+# Bounds of a bulk export: a year, month or day (both inclusive)
+DATE_BOUND = re.compile(r"\d{4}(-\d{2}(-\d{2})?)?$")
+
+
+# ------------------ Transaction Row ------------------
+class TransactionRow(RecycleDataViewBehavior, Card):
+    """One card of the transaction list. The RecycleView reuses rows while scrolling."""
+
+    def __init__(self, **kwargs):
+        super().__init__(orientation='horizontal', spacing=10, padding=10, radius=[12], **kwargs)
+        self.txn = None
+        self.on_view = None
+
+        # Info text
+        self.info_label = Label(halign='left', valign='middle')
+        self.info_label.bind(size=self.info_label.setter('text_size'))
+        self.add_widget(self.info_label)
+
+        # View button
+        self.btn_view = Button(text="View", size_hint=(None, 1), width=100)
+        self.btn_view.bind(on_release=self.view)
+        self.add_widget(self.btn_view)
+
+    def refresh_view_attrs(self, rv, index, data):
+        # ✅ Only update what a row shows; nothing is created here
+        self.txn = data.get("txn")
+        self.on_view = data.get("on_view")
+        self.info_label.text = data["info"]
+        self.info_label.color = data.get("color", (1, 1, 1, 1))
+        self.btn_view.opacity = 1 if self.txn else 0
+        self.btn_view.disabled = self.txn is None
+
+    def view(self, instance):
+        if self.txn and self.on_view:
+            self.on_view(self.txn)
+
 
 class ViewTransactionsScreen(Screen):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
+        self._request = 0       # bumped per display, so late background pages are dropped
+        self._fetching = False  # a background page is on its way
+        self.query = ("", "")   # (product, date) of the list shown
+        self.cursor = None      # sale_key() of the last row shown
+        self.exhausted = True   # no older page left
+        self._anchor = None     # distance from the top to keep while a page is added
+        self._load_more = Clock.create_trigger(self.load_page)
 
         self.layout = BoxLayout(orientation='vertical', padding=15, spacing=10)
         self.add_widget(self.layout)
@@ -39,29 +98,32 @@ class ViewTransactionsScreen(Screen):
         search_layout.add_widget(btn_search)
         self.layout.add_widget(search_layout)
 
-        # Scrollable transactions area
-        self.scroll = ScrollView(size_hint=(1, 0.75))
-        self.grid = GridLayout(cols=1, spacing=10, size_hint_y=None, padding=(0, 5))
-        self.grid.bind(minimum_height=self.grid.setter('height'))
-        self.scroll.add_widget(self.grid)
-        self.layout.add_widget(self.scroll)
+        # Recycled transactions list: only the visible rows are widgets
+        self.rv = RecycleView(size_hint=(1, 0.75))
+        self.rv.viewclass = TransactionRow
+        rows = RecycleBoxLayout(
+            orientation='vertical',
+            default_size=(None, 100),
+            default_size_hint=(1, None),
+            size_hint_y=None,
+            spacing=10,
+            padding=(0, 5)
+        )
+        rows.bind(minimum_height=rows.setter('height'))
+        rows.bind(height=self.keep_anchor)
+        self.rv.add_widget(rows)
+        self.rv.bind(scroll_y=self.on_scroll)
+        self.layout.add_widget(self.rv)
 
-        # Back button
-        btn_back = Button(text="⬅ Back", size_hint=(1, 0.05))
+        # Back / bulk export
+        bottom = BoxLayout(size_hint=(1, 0.05), spacing=10)
+        btn_back = Button(text="⬅ Back")
         btn_back.bind(on_release=self.go_back)
-        self.layout.add_widget(btn_back)
-
-    # ------------------ JSON Helpers ------------------
-    def load_json(self, filename, default=None):
-        path = get_file_path(filename)
-        default = default or {}
-        try:
-            with open(path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                return data if isinstance(data, dict) else default
-        except Exception as e:
-            print(f"[ERROR] Failed to load {filename}: {e}")
-            return default
+        btn_export = Button(text="⬇ Export CSV")
+        btn_export.bind(on_release=self.open_export_popup)
+        bottom.add_widget(btn_back)
+        bottom.add_widget(btn_export)
+        self.layout.add_widget(bottom)
 
     # ------------------ Lifecycle ------------------
     def on_pre_enter(self):
@@ -71,59 +133,121 @@ class ViewTransactionsScreen(Screen):
 
     # ------------------ Display Transactions ------------------
     def display_transactions(self, product_query="", date_query=""):
-        self.grid.clear_widgets()
-        data = self.load_json("transactions.json", default={"sales": []})
-        transactions = data.get("sales", [])
+        self._request += 1
+        self._fetching = False
+        self.query = (product_query, date_query)
+        self.cursor = None
+        self.exhausted = True
+        store = App.get_running_app().store
 
-        if not transactions:
-            self.grid.add_widget(Label(text="No transactions yet.", size_hint_y=None, height=40))
+        if not self.pages_in_background(store):
+            self.show_first_page(store.page_sales(None, PAGE_SIZE, product_query, date_query))
             return
 
-        filtered = [
-            t for t in transactions
-            if (product_query.lower() in t.get("product", "").lower() if product_query else True)
-            and (date_query in t.get("date", "") if date_query else True)
-        ]
+        # ✅ No date index: the page worker streams the newest matches off the end of
+        # the file so the first cards show quickly, then builds the first page
+        self.show_rows([{"info": "Loading transactions..."}])
+        query = self.query
+
+        def preview():
+            newest = store.iter_sales(newest_first=True)
+            return list(islice((t for t in newest if sale_matches(t, *query)), SCREENFUL))
+
+        self.in_background(preview, self.show_preview)
+        self.fetch_page(None, self.show_first_page)
+
+    def show_preview(self, first):
+        if first:
+            self.show_rows([self.row_data(t) for t in first])
 
-        if not filtered:
-            self.grid.add_widget(Label(text="No matching results.", size_hint_y=None, height=40))
+    def show_first_page(self, page):
+        # ✅ Newest page first; older pages are fetched while scrolling down
+        if not page:
+            empty = "No matching results." if any(self.query) else "No transactions yet."
+            self.show_rows([{"info": empty}])
             return
+        self.show_rows([self.row_data(t) for t in page])
+        self.advance(page)
+
+    def advance(self, page):
+        self.cursor = sale_key(page[-1])
+        self.exhausted = len(page) < PAGE_SIZE
+
+    def pages_in_background(self, store):
+        """Without a date index a page streams the whole JSON file: keep that off the UI thread."""
+        return not store.storage.DATE_INDEXED
+
+    def in_background(self, job, on_done):
+        """Run `job` on the app's page worker; its result is dropped if the list was redisplayed meanwhile."""
+        request = self._request
+
+        def deliver(result):
+            if request == self._request:
+                on_done(result)
+
+        App.get_running_app().pages.submit(job, deliver)
 
-        for txn in reversed(filtered):  # Show latest first
-            card = BoxLayout(
-                orientation='horizontal',
-                size_hint_y=None,
-                height=100,
-                spacing=10,
-                padding=10
-            )
-            # Background
-            with card.canvas.before:
-                Color(0.12, 0.12, 0.12, 1)
-                card.bg_rect = RoundedRectangle(pos=card.pos, size=card.size, radius=[12])
-            card.bind(pos=lambda inst, val, rect=card.bg_rect: setattr(rect, 'pos', val))
-            card.bind(size=lambda inst, val, rect=card.bg_rect: setattr(rect, 'size', val))
-
-            # Info text
-            debt = txn.get("debt", 0.0)
-            debt_text = f" | Debt: ₦{debt:.2f}" if debt > 0 else ""
-            debt_color = (1, 0, 0, 1) if debt > 0 else (1, 1, 1, 1)
-
-            info_text = (
+    def fetch_page(self, before, on_page):
+        store, query = App.get_running_app().store, self.query
+        self._fetching = True
+
+        def deliver(page):
+            self._fetching = False
+            on_page(page)
+
+        self.in_background(lambda: store.page_sales(before, PAGE_SIZE, *query), deliver)
+
+    def load_page(self, *args):
+        """Append the next older page below the rows shown."""
+        if self.exhausted or self._fetching:
+            return
+        store = App.get_running_app().store
+        if self.pages_in_background(store):
+            self.fetch_page(self.cursor, self.add_page)
+        else:
+            self.add_page(store.page_sales(self.cursor, PAGE_SIZE, *self.query))
+
+    def add_page(self, page):
+        if not page:
+            self.exhausted = True
+            return
+        scrollable = self.rv.layout_manager.height - self.rv.height
+        self._anchor = (1 - self.rv.scroll_y) * max(scrollable, 0)
+        self.rv.data.extend(self.row_data(t) for t in page)
+        self.advance(page)
+
+    def on_scroll(self, rv, scroll_y):
+        if scroll_y <= LOAD_MORE_AT and not self.exhausted:
+            self._load_more()
+
+    def keep_anchor(self, rows, height):
+        """Keep the rows in view where they were when a page grows the list, and fill a short screen."""
+        scrollable = height - self.rv.height
+        if self._anchor is not None:
+            if scrollable > 0:
+                self.rv.scroll_y = 1 - self._anchor / scrollable
+            self._anchor = None
+        if scrollable <= 0 and not self.exhausted:
+            self._load_more()
+
+    def row_data(self, txn):
+        """Plain dict the RecycleView hands to a TransactionRow."""
+        debt = txn.get("debt", 0.0)
+        debt_text = f" | Debt: ₦{debt:.2f}" if debt > 0 else ""
+        return {
+            "info": (
                 f"{txn.get('date', '')}\n"
                 f"{txn.get('buyer', '')} bought {txn.get('quantity', 0)} x {txn.get('product', '')}\n"
                 f"Paid: ₦{txn.get('amount_paid', 0.0):.2f}{debt_text}"
-            )
-            info_label = Label(text=info_text, halign='left', valign='middle', color=debt_color)
-            info_label.bind(size=info_label.setter('text_size'))
-            card.add_widget(info_label)
-
-            # View button
-            btn_view = Button(text="View", size_hint=(None, 1), width=100)
-            btn_view.bind(on_release=lambda inst, t=txn: self.open_single_transaction(t))
-            card.add_widget(btn_view)
+            ),
+            "color": (1, 0, 0, 1) if debt > 0 else (1, 1, 1, 1),
+            "txn": txn,
+            "on_view": self.open_single_transaction,
+        }
 
-            self.grid.add_widget(card)
+    def show_rows(self, rows):
+        self.rv.data = rows
+        self.rv.scroll_y = 1
 
     # ------------------ Search ------------------
     def search_transactions(self, instance):
@@ -131,6 +255,63 @@ class ViewTransactionsScreen(Screen):
         date_query = self.date_input.text.strip()
         self.display_transactions(product_query, date_query)
 
+    # ------------------ Bulk CSV Export ------------------
+    def open_export_popup(self, instance):
+        layout = BoxLayout(orientation='vertical', spacing=10, padding=10)
+        today = date.today()
+        start_input = TextInput(text=today.strftime("%Y-%m-01"), hint_text="From (YYYY-MM-DD)", multiline=False)
+        end_input = TextInput(text=today.strftime("%Y-%m-%d"), hint_text="To (YYYY-MM-DD)", multiline=False)
+        layout.add_widget(start_input)
+        layout.add_widget(end_input)
+
+        gzip_row = BoxLayout(spacing=10)
+        gzip_check = CheckBox(size_hint_x=None, width=40)
+        gzip_row.add_widget(gzip_check)
+        gzip_row.add_widget(Label(text="Compress (.csv.gz)", halign='left', valign='middle'))
+        layout.add_widget(gzip_row)
+
+        message = Label(text="Leave a date empty for no limit.", color=(0.7, 0.7, 0.7, 1))
+        layout.add_widget(message)
+
+        popup = Popup(title="Export Sales to CSV", content=layout, size_hint=(0.85, 0.6))
+
+        def export(btn):
+            start, end = start_input.text.strip(), end_input.text.strip()
+            if not all(DATE_BOUND.match(d) for d in (start, end) if d):
+                message.text = "⚠️ Dates must look like YYYY, YYYY-MM or YYYY-MM-DD."
+                message.color = (1, 0, 0, 1)
+                return
+            popup.dismiss()
+            self.export_sales_csv(start, end, gzip_check.active)
+
+        buttons = BoxLayout(spacing=10)
+        btn_export = Button(text="Export")
+        btn_export.bind(on_release=export)
+        btn_cancel = Button(text="Cancel")
+        btn_cancel.bind(on_release=popup.dismiss)
+        buttons.add_widget(btn_export)
+        buttons.add_widget(btn_cancel)
+        layout.add_widget(buttons)
+        popup.open()
+
+    def export_sales_csv(self, start="", end="", compress=False):
+        """
+        Every sale dated from `start` through `end` in one CSV, with its
+        payment history. Sales stream from storage into the file in an
+        export worker, so neither the UI nor memory waits on the row count.
+        """
+        app = App.get_running_app()
+        storage = app.storage
+        debts = app.store.debts()  # read-only snapshot, safe to hand to the worker
+        export_path = get_export_path()
+        filename = f"sales_{start or 'first'}_to_{end or 'last'}.csv" + (".gz" if compress else "")
+        filepath = os.path.join(export_path, filename)
+
+        def job():
+            return write_sales_csv(filepath, storage.sales_between(start, end), payment_histories(debts), compress)
+
+        ExportPopup("Sales Export").run(job, lambda count: f"{count} sales saved as:\n{filepath}")
+
     # ------------------ Open Single Transaction ------------------
     def open_single_transaction(self, txn):
         if 'view_single_transaction' in self.manager.screen_names:
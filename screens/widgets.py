@@ -0,0 +1,84 @@
+# screens/widgets.py
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.behaviors import ButtonBehavior
+from kivy.properties import ListProperty
+from kivy.graphics import Color, RoundedRectangle
+from kivy.metrics import dp
+
+
+# ------------------ Card ------------------
+class Card(BoxLayout):
+    """
+    BoxLayout on a rounded background. The Color and RoundedRectangle are
+    made once per card and follow it through bound methods; setting
+    `background` or `radius` changes them in place.
+    """
+
+    background = ListProperty([0.12, 0.12, 0.12, 1])
+    radius = ListProperty([dp(12)])
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        with self.canvas.before:
+            self.bg_color = Color(rgba=self.background)
+            self.bg_rect = RoundedRectangle(pos=self.pos, size=self.size, radius=self.radius)
+        self.bind(pos=self.update_rect, size=self.update_rect)
+
+    def update_rect(self, *args):
+        self.bg_rect.pos = self.pos
+        self.bg_rect.size = self.size
+
+    def on_background(self, instance, value):
+        if hasattr(self, "bg_color"):  # not drawn yet while kwargs are applied
+            self.bg_color.rgba = value
+
+    def on_radius(self, instance, value):
+        if hasattr(self, "bg_rect"):
+            self.bg_rect.radius = value
+
+
+class ClickableCard(ButtonBehavior, Card):
+    """Card that acts as a button, shown in `pressed_background` while held (if set)."""
+
+    pressed_background = ListProperty([])
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.normal_background = list(self.background)
+
+    def on_state(self, instance, value):
+        if not self.pressed_background:
+            return
+        self.background = self.pressed_background if value == "down" else self.normal_background
+
+
+# ------------------ Card Pool ------------------
+class CardPool:
+    """
+    Cards kept across refreshes: release() takes a card off screen and
+    take() hands it out again before building a new one with `factory`,
+    so a refresh re-fills existing cards instead of allocating new ones.
+    """
+
+    def __init__(self, factory, limit=200):
+        self.factory = factory
+        self.limit = limit
+        self._free = []
+
+    def take(self):
+        card = self._free.pop() if self._free else self.factory()
+        card.pool = self
+        return card
+
+    def release(self, card):
+        if card.parent:
+            card.parent.remove_widget(card)
+        if len(self._free) < self.limit:
+            self._free.append(card)
+
+    def release_all(self, container):
+        """Empty `container`, keeping the cards that came from this pool."""
+        for child in list(container.children):
+            container.remove_widget(child)
+            if getattr(child, "pool", None) is self and len(self._free) < self.limit:
+                self._free.append(child)
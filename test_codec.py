@@ -0,0 +1,68 @@
+# test_codec.py
+import json
+
+import pytest
+
+from utils import codec
+
+SALES = [
+    {"id": "1", "buyer": "Ada", "product": "Rice", "quantity": 2, "total_price": 20.5},
+    {"id": "2", "buyer": "Émeka", "product": 'Oil "5L"', "quantity": 1, "history": [{"paid": 3}]},
+    {"id": "3", "buyer": "Ngozi", "product": "Beans", "quantity": 4, "note": None},
+]
+DOCS = {
+    "app layout": {"sales": SALES},
+    "bare list": SALES,
+    "goods": {"Rice": {"price": 10, "quantity": 5}, "Garri": {"price": 2.5, "quantity": 0}},
+    "mixed": {"version": 2, "tags": ["a", "b"], "sales": SALES, "empty": []},
+    "empty list": [],
+    "empty dict": {},
+}
+
+
+@pytest.mark.parametrize("name", DOCS)
+@pytest.mark.parametrize("fmt", codec.FORMATS)
+def test_round_trip(name, fmt):
+    raw = codec.encode(DOCS[name], fmt)
+    assert codec.detect(raw) == ("binary" if fmt == "binary" else "json")
+    assert codec.decode(raw) == DOCS[name]
+
+
+@pytest.mark.parametrize("name", ["app layout", "bare list", "mixed"])
+@pytest.mark.parametrize("reverse", [False, True])
+def test_iter_records(name, reverse):
+    raw = codec.encode(DOCS[name], "binary")
+    expected = SALES[::-1] if reverse else SALES
+    assert list(codec.iter_records(raw, "sales", reverse)) == expected
+
+
+def test_iter_records_without_the_list():
+    raw = codec.encode({"debts": SALES, "count": 3}, "binary")
+    assert list(codec.iter_records(raw, "sales")) == []
+    assert list(codec.iter_records(raw, "count")) == []  # not a list
+
+
+def test_decode_rejects_a_truncated_file():
+    raw = codec.encode(DOCS["app layout"], "binary")
+    with pytest.raises(ValueError):
+        codec.decode(raw[:-5])
+
+
+@pytest.mark.parametrize("dst, fmt", [("goods.ivb", "binary"), ("goods.json", "pretty")])
+def test_convert_file_picks_the_format_from_the_extension(tmp_path, dst, fmt):
+    src = tmp_path / "src.json"
+    src.write_bytes(codec.encode(DOCS["mixed"], "compact"))
+    assert codec.convert_file(str(src), str(tmp_path / dst)) == fmt
+    raw = (tmp_path / dst).read_bytes()
+    assert codec.decode(raw) == DOCS["mixed"]
+    assert not (tmp_path / f"{dst}.tmp").exists()
+
+
+def test_command_line_round_trip(tmp_path, capsys):
+    src, ivb, back = tmp_path / "transactions.json", tmp_path / "transactions.ivb", tmp_path / "back.json"
+    src.write_text(json.dumps(DOCS["app layout"]), encoding="utf-8")
+    codec.main([str(src), str(ivb)])
+    codec.main([str(ivb), str(back), "--format", "compact"])
+    assert "[OK]" in capsys.readouterr().out
+    assert codec.detect(ivb.read_bytes()) == "binary"
+    assert back.read_bytes() == codec.encode(DOCS["app layout"], "compact")
@@ -0,0 +1,75 @@
+# test_jsonstream.py
+import io
+import json
+
+import pytest
+
+from utils.jsonstream import iter_collection, iter_collection_reversed
+
+RECORDS = [
+    {"id": "1", "buyer": 'Ada "the boss"', "product": "Rice [50kg]", "price": 12.5},
+    {"id": "2", "buyer": "C:\\shop\\", "product": "Beans {red}", "note": "ends with \\\""},
+    {"id": "3", "buyer": "Ngozi", "product": "Oil", "items": [{"n": 1}, {"n": [2, 3]}], "paid": 1e3},
+]
+LAYOUTS = {
+    "bare list": RECORDS,
+    "keyed": {"meta": {"version": 2, "rate": 0.75}, "sales": RECORDS},
+}
+# 1 byte upwards puts a chunk boundary inside every string, number and bracket
+CHUNK_SIZES = [1, 2, 3, 7, 64 * 1024]
+
+
+def encode(doc, pretty):
+    text = json.dumps(doc, indent=4, ensure_ascii=False) if pretty else json.dumps(doc, separators=(",", ":"))
+    return io.BytesIO(text.encode("utf-8"))
+
+
+@pytest.mark.parametrize("layout", LAYOUTS)
+@pytest.mark.parametrize("pretty", [True, False])
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_forward(layout, pretty, chunk_size):
+    f = encode(LAYOUTS[layout], pretty)
+    assert list(iter_collection(f, "sales", chunk_size)) == RECORDS
+
+
+@pytest.mark.parametrize("layout", LAYOUTS)
+@pytest.mark.parametrize("pretty", [True, False])
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_reversed(layout, pretty, chunk_size):
+    f = encode(LAYOUTS[layout], pretty)
+    assert list(iter_collection_reversed(f, "sales", chunk_size)) == RECORDS[::-1]
+
+
+@pytest.mark.parametrize("chunk_size", range(1, 12))
+def test_forward_numbers_cut_by_a_chunk(chunk_size):
+    # "12." or "3e" at the end of a chunk is not a whole number yet
+    f = io.BytesIO(b'{"rate": 12.25, "sales": [1.5, 3e2, -40, 0.125]}')
+    assert list(iter_collection(f, "sales", chunk_size)) == [1.5, 300.0, -40, 0.125]
+
+
+@pytest.mark.parametrize("doc", [{}, {"sales": []}, []])
+def test_empty(doc):
+    assert list(iter_collection(encode(doc, True), "sales")) == []
+    assert list(iter_collection_reversed(encode(doc, True), "sales")) == []
+
+
+class CountingFile(io.BytesIO):
+    read_bytes = 0
+
+    def read(self, size=-1):
+        data = super().read(size)
+        self.read_bytes += len(data)
+        return data
+
+
+@pytest.mark.parametrize("reader", [iter_collection, iter_collection_reversed])
+def test_stops_reading_when_the_caller_stops(reader):
+    f = CountingFile(encode({"sales": RECORDS * 1000}, True).getvalue())
+    assert next(reader(f, "sales", chunk_size=256)) in RECORDS
+    assert f.read_bytes <= 1024
+
+
+def test_reversed_rejects_a_list_under_another_key():
+    f = encode({"debts": RECORDS}, False)
+    with pytest.raises(ValueError):
+        list(iter_collection_reversed(f, "sales"))
@@ -0,0 +1,230 @@
+# test_storage.py
+import json
+import os
+from datetime import datetime
+
+import pytest
+
+from utils.storage import (
+    JsonStorage, JournalStorage, PartitionedStorage, ensure_ids, new_id, open_storage, records_of,
+)
+
+ENGINES = [JsonStorage, JournalStorage, PartitionedStorage]
+
+
+def sale(date):
+    return {"id": new_id(), "buyer": "Ada", "product": "Rice", "quantity": 1, "date": date}
+
+
+def log_commit(storage, entry):
+    """Append a commit to the log the way commit() does, without applying it."""
+    with open(storage.path(storage.COMMIT_LOG), "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry) + "\n")
+
+
+def crash_during_commit(storage, records, applied):
+    """Log a commit appending `records`, write only the first `applied` of them, and stop."""
+    log_commit(storage, {"append": [["transactions.json", record] for record in records]})
+    for record in records[:applied]:
+        storage._apply([{"append": [["transactions.json", record]]}], replay=False)
+
+
+def sales_of(storage):
+    return records_of(storage.load("transactions.json", {}), "transactions.json")
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("applied", [0, 1, 2])
+def test_replay_writes_each_append_once(tmp_path, engine, applied):
+    storage = engine(str(tmp_path))
+    first = sale("2025-08-03 10:00:00")
+    storage.append("transactions.json", first)
+    a, b = sale("2025-08-03 11:00:00"), sale("2025-08-03 11:00:00")
+    crash_during_commit(storage, [a, b], applied)
+
+    reopened = engine(str(tmp_path))
+    assert [s["id"] for s in sales_of(reopened)] == [first["id"], a["id"], b["id"]]
+    assert not os.path.exists(reopened.path(reopened.COMMIT_LOG))
+    reopened.close()
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_replay_applies_commits_in_order_and_drops_a_torn_line(tmp_path, engine):
+    storage = engine(str(tmp_path))
+    storage.save("goods.json", {"Rice": {"price": 10, "quantity": 5}})
+    a = sale("2025-08-03 11:00:00")
+    log_commit(storage, {"products": {"Rice": {"price": 10, "quantity": 4}}, "append": [["transactions.json", a]]})
+    log_commit(storage, {"products": {"Rice": {"price": 10, "quantity": 3}}})
+    with open(storage.path(storage.COMMIT_LOG), "a", encoding="utf-8") as f:
+        f.write('{"products": {"Rice": {"price": 10, "quan')  # torn: never committed
+
+    reopened = engine(str(tmp_path))
+    assert reopened.load("goods.json")["Rice"]["quantity"] == 3
+    assert [s["id"] for s in sales_of(reopened)] == [a["id"]]
+    reopened.close()
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_commit_logs_only_the_changes(tmp_path, engine):
+    storage = engine(str(tmp_path))
+    storage.save("transactions.json", {"sales": [sale("2025-08-0%d" % (i % 9 + 1)) for i in range(200)]})
+    a = sale("2025-08-03 11:00:00")
+    with storage.transaction() as tx:
+        tx.put_product("Rice", {"price": 10, "quantity": 4})
+        tx.append("transactions.json", a)
+    with open(storage.path(storage.COMMIT_LOG), encoding="utf-8") as f:
+        entries = [json.loads(line) for line in f]
+    # (the partitioned engine logs its save() too)
+    assert entries[-1] == {"replace": {}, "products": {"Rice": {"price": 10, "quantity": 4}},
+                           "append": [["transactions.json", a]], "update": []}
+    assert sales_of(storage)[-1] == a
+    storage.close()
+    assert not os.path.exists(storage.path(storage.COMMIT_LOG))
+
+
+@pytest.mark.parametrize("folded", [False, True])
+def test_journal_folds_a_rotated_journal_only_once(tmp_path, folded):
+    a, b, c = sale("2025-08-01 10:00:00"), sale("2025-08-02 10:00:00"), sale("2025-08-03 10:00:00")
+    # Crash with the journal rotated away: before the new snapshot was written, or after
+    # it replaced [a, b] with a snapshot of the same size that already holds c
+    JsonStorage(str(tmp_path)).save("transactions.json", {"sales": [a, c] if folded else [a, b]})
+    with open(tmp_path / "transactions.jsonl.2", "w", encoding="utf-8") as f:
+        f.write(json.dumps(c) + "\n")
+
+    storage = JournalStorage(str(tmp_path))
+    assert sales_of(storage) == ([a, c] if folded else [a, b, c])
+    assert not os.path.exists(tmp_path / "transactions.jsonl.2")
+    storage.close()
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_update_record_logs_only_the_record(tmp_path, engine):
+    storage = engine(str(tmp_path))
+    a, b = sale("2025-08-03 10:00:00"), sale("2025-08-03 11:00:00")
+    storage.save("debts.json", {"debts": [a, b]})
+    storage.update_record("debts.json", dict(b, quantity=2))
+    with pytest.raises(KeyError):
+        storage.update_record("debts.json", sale("2025-08-03 12:00:00"))
+
+    with open(storage.path(storage.COMMIT_LOG), encoding="utf-8") as f:
+        entries = [json.loads(line) for line in f]
+    assert entries == [{"replace": {}, "products": {}, "append": [], "update": [["debts.json", dict(b, quantity=2)]]}]
+    assert storage.load("debts.json")["debts"] == [a, dict(b, quantity=2)]
+    storage.close()
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_ensure_ids_runs_once(tmp_path, engine):
+    storage = engine(str(tmp_path))
+    storage.save("transactions.json", {"sales": [{"product": "Rice"}]})
+    ensure_ids(storage)
+    assert sales_of(storage)[0]["id"]
+
+    storage.save("transactions.json", {"sales": [{"product": "Beans"}]})
+    ensure_ids(storage)
+    assert "id" not in sales_of(storage)[0]
+    storage.close()
+
+
+def test_open_storage_migrates_json_to_sqlite_and_remembers_the_engine(tmp_path, monkeypatch):
+    monkeypatch.delenv("INVOICEAPP_STORAGE", raising=False)
+    monkeypatch.delenv("INVOICEAPP_FORMAT", raising=False)
+    a = sale("2025-08-03 11:00:00")
+    JsonStorage(str(tmp_path)).save("transactions.json", {"sales": [a]})
+
+    storage = open_storage(str(tmp_path))
+    assert storage.name == "sqlite"
+    assert [s["id"] for s in sales_of(storage)] == [a["id"]]
+    storage.close()
+    with open(tmp_path / "storage.json", encoding="utf-8") as f:
+        assert json.load(f) == {"engine": "sqlite"}
+
+
+def test_open_storage_keeps_a_folders_engine(tmp_path, monkeypatch):
+    monkeypatch.delenv("INVOICEAPP_FORMAT", raising=False)
+    monkeypatch.setenv("INVOICEAPP_STORAGE", "journal")
+    open_storage(str(tmp_path), fmt="compact").close()
+
+    monkeypatch.delenv("INVOICEAPP_STORAGE")
+    storage = open_storage(str(tmp_path))
+    assert (storage.name, storage.fmt) == ("journal", "compact")
+    storage.close()
+
+
+# -------------------- Partitioned Engine --------------------
+NOW = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+THIS_MONTH = NOW[:7]
+
+
+def partition_files(storage):
+    return sorted(os.listdir(storage.partition_dir()))
+
+
+def split_history(tmp_path):
+    sales = [sale("2025-07-09 09:00:00"), sale("2025-08-01 10:00:00"), sale("2025-08-30 18:00:00"),
+             sale(NOW), {"id": new_id(), "buyer": "Ada", "product": "Rice"}]
+    JsonStorage(str(tmp_path)).save("transactions.json", {"sales": sales})
+    return PartitionedStorage(str(tmp_path)), sales
+
+
+def test_partitioned_splits_sales_by_month_and_seals_past_months(tmp_path):
+    storage, sales = split_history(tmp_path)
+    assert partition_files(storage) == sorted([
+        "2025-07.jsonl.gz", "2025-08.jsonl.gz", f"{THIS_MONTH}.jsonl", "undated.jsonl", "manifest.json",
+    ])
+    partitions = storage._manifest["partitions"]
+    assert partitions["2025-08"] == {"count": 2, "first": "2025-08-01 10:00:00", "last": "2025-08-30 18:00:00",
+                                     "bytes": os.path.getsize(storage.partition_path("2025-08", True)),
+                                     "sealed": True}
+    assert not partitions[THIS_MONTH]["sealed"]
+    with open(storage.path("sales/manifest.json"), encoding="utf-8") as f:
+        assert json.load(f)["partitions"] == partitions
+
+    by_id = sorted(sales_of(storage), key=lambda s: s["id"])
+    assert by_id == sorted(sales, key=lambda s: s["id"])
+    assert [s["id"] for s in storage.sales_by_date("2025-08")] == [sales[1]["id"], sales[2]["id"]]
+    storage.close()
+
+
+def test_partitioned_back_dated_sale_reopens_its_month_until_restart(tmp_path):
+    storage, _ = split_history(tmp_path)
+    late = sale("2025-07-20 12:00:00")
+    storage.append("transactions.json", late)
+    assert "2025-07.jsonl" in partition_files(storage)
+    assert "2025-07.jsonl.gz" not in partition_files(storage)
+    storage.close()
+
+    reopened = PartitionedStorage(str(tmp_path))
+    assert "2025-07.jsonl.gz" in partition_files(reopened)
+    assert reopened._manifest["partitions"]["2025-07"]["count"] == 2
+    assert late in list(reopened.sales_by_date("2025-07"))
+    reopened.close()
+
+
+def test_partitioned_recovers_a_torn_line_and_a_stale_manifest(tmp_path):
+    storage, sales = split_history(tmp_path)
+    storage.close()
+    with open(storage.partition_path(THIS_MONTH), "a", encoding="utf-8") as f:
+        f.write('{"id": "torn", "date": "')   # crash mid-append
+    with open(storage.path("sales/manifest.json"), "w", encoding="utf-8") as f:
+        f.write("{")                          # crash mid-manifest
+
+    reopened = PartitionedStorage(str(tmp_path))
+    assert sorted(s["id"] for s in sales_of(reopened)) == sorted(s["id"] for s in sales)
+    assert reopened._manifest["partitions"][THIS_MONTH]["count"] == 1
+    with open(reopened.partition_path(THIS_MONTH), "rb") as f:
+        assert f.read().endswith(b"\n")
+    reopened.close()
+
+
+def test_partitioned_finishes_an_interrupted_seal(tmp_path):
+    storage, _ = split_history(tmp_path)
+    storage.close()
+    # Crash after the .gz copy was written but before the plain file was removed
+    with open(storage.partition_path("2025-08"), "w", encoding="utf-8") as f:
+        f.write(json.dumps(sale("2025-08-02 08:00:00")) + "\n")
+
+    reopened = PartitionedStorage(str(tmp_path))
+    assert "2025-08.jsonl" not in partition_files(reopened)
+    assert len(list(reopened.sales_by_date("2025-08"))) == 2   # the manifest's live (sealed) copy
+    reopened.close()
@@ -0,0 +1,186 @@
+"""
+On-disk encodings for the data files.
+
+  pretty   json.dump(indent=4), the original human-readable layout
+  compact  minified JSON (no indentation or spaces)
+  binary   "IVB1" length-prefixed frames: each top-level entry is a frame,
+           and record lists (sales, debts) carry an offset table in front
+           of their minified JSON array. A whole list decodes with one
+           C-speed json.loads call; single records can be sliced out by
+           index without parsing the rest of the file
+
+decode() detects the encoding from the first bytes, so any file can be
+read whatever the storage is configured to write.
+
+Convert files from the command line:
+
+    python -m utils.codec goods.json goods.ivb --format binary
+    python -m utils.codec goods.ivb goods.json
+"""
+import os
+import sys
+import json
+import struct
+import argparse
+
+FORMATS = ("pretty", "compact", "binary")
+EXTENSIONS = {"pretty": ".json", "compact": ".json", "binary": ".ivb"}
+
+MAGIC = b"IVB1"
+KIND_DICT = b"D"        # {key: value, ...}
+KIND_LIST = b"L"        # [value, ...]
+VALUE_JSON = b"J"       # dict value: one JSON frame
+VALUE_LIST = b"L"       # dict value: a list, one frame per item
+_LEN = struct.Struct("<I")
+
+
+# -------------------- Binary Frames --------------------
+def _frame(payload):
+    return _LEN.pack(len(payload)) + payload
+
+
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _indexed_list(values):
+    """Offset table + JSON array: <count><offset>*count[item,item,...]"""
+    items = [_dumps(value) for value in values]
+    offsets = []
+    position = 1  # after "["
+    for item in items:
+        offsets.append(position)
+        position += len(item) + 1  # item plus "," / "]"
+    table = struct.pack(f"<I{len(offsets)}I", len(offsets), *offsets)
+    return table + b"[" + b",".join(items) + b"]"
+
+
+def _encode_binary(data):
+    if isinstance(data, dict):
+        parts = [MAGIC, KIND_DICT]
+        for key, value in data.items():
+            parts.append(_frame(key.encode("utf-8")))
+            if isinstance(value, list):
+                parts.append(_frame(VALUE_LIST + _indexed_list(value)))
+            else:
+                parts.append(_frame(VALUE_JSON + _dumps(value)))
+    else:
+        parts = [MAGIC, KIND_LIST, _indexed_list(data)]
+    return b"".join(parts)
+
+
+def iter_frames(raw, offset=len(MAGIC) + 1):
+    """Yield the raw frame payloads of a binary dict document."""
+    view = memoryview(raw)
+    end = len(raw)
+    while offset < end:
+        (size,) = _LEN.unpack_from(raw, offset)
+        offset += _LEN.size
+        if offset + size > end:
+            raise ValueError("truncated binary frame")
+        yield view[offset:offset + size]
+        offset += size
+
+
+def _split_list(view):
+    """Return (record offsets, JSON array bytes) of an indexed list."""
+    (count,) = _LEN.unpack_from(view, 0)
+    start = _LEN.size * (count + 1)
+    offsets = struct.unpack_from(f"<{count}I", view, _LEN.size)
+    return offsets, view[start:]
+
+
+def iter_list(view, reverse=False):
+    """Decode the records of an indexed list one at a time (last first if `reverse`)."""
+    offsets, array = _split_list(view)
+    spans = list(zip(offsets, offsets[1:] + (len(array),)))
+    for begin, end in reversed(spans) if reverse else spans:
+        yield json.loads(bytes(array[begin:end - 1]))
+
+
+def _decode_binary(raw):
+    view = memoryview(raw)
+    kind = raw[len(MAGIC):len(MAGIC) + 1]
+    if kind == KIND_LIST:
+        return json.loads(bytes(_split_list(view[len(MAGIC) + 1:])[1]))
+    if kind != KIND_DICT:
+        raise ValueError(f"unknown binary document kind {kind!r}")
+    data = {}
+    frames = iter_frames(raw)
+    for key in frames:
+        value = next(frames)
+        if value[:1] == VALUE_LIST:
+            data[str(key, "utf-8")] = json.loads(bytes(_split_list(value[1:])[1]))
+        else:
+            data[str(key, "utf-8")] = json.loads(bytes(value[1:]))
+    return data
+
+
+# -------------------- Public API --------------------
+def iter_records(raw, key, reverse=False):
+    """
+    Records of a binary document's list, parsed one at a time through the
+    offset table: the top-level list, or the list stored under `key`. A
+    reader that stops early never parses the rest.
+    """
+    kind = raw[len(MAGIC):len(MAGIC) + 1]
+    if kind == KIND_LIST:
+        yield from iter_list(memoryview(raw)[len(MAGIC) + 1:], reverse)
+        return
+    if kind != KIND_DICT:
+        raise ValueError(f"unknown binary document kind {kind!r}")
+    frames = iter_frames(raw)
+    for name in frames:
+        value = next(frames)
+        if str(name, "utf-8") == key and value[:1] == VALUE_LIST:
+            yield from iter_list(value[1:], reverse)
+            return
+
+
+def detect(raw):
+    return "binary" if raw[:len(MAGIC)] == MAGIC else "json"
+
+
+def encode(data, fmt="pretty"):
+    """Serialise a document to bytes in the given format."""
+    if fmt == "binary":
+        return _encode_binary(data)
+    if fmt == "compact":
+        return _dumps(data)
+    if fmt == "pretty":
+        return json.dumps(data, indent=4, ensure_ascii=False).encode("utf-8")
+    raise ValueError(f"Unknown data format: {fmt}")
+
+
+def decode(raw):
+    """Parse bytes in any supported format (detected automatically)."""
+    if detect(raw) == "binary":
+        return _decode_binary(raw)
+    return json.loads(raw.decode("utf-8"))
+
+
+def convert_file(src, dst, fmt=None):
+    """Rewrite `src` as `dst`; the format defaults to the one matching dst's extension."""
+    if fmt is None:
+        fmt = "binary" if dst.endswith(EXTENSIONS["binary"]) else "pretty"
+    with open(src, "rb") as f:
+        data = decode(f.read())
+    tmp = f"{dst}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(encode(data, fmt))
+    os.replace(tmp, dst)
+    return fmt
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert InvoiceApp data files between formats.")
+    parser.add_argument("src")
+    parser.add_argument("dst")
+    parser.add_argument("--format", choices=FORMATS, default=None)
+    args = parser.parse_args(argv)
+    fmt = convert_file(args.src, args.dst, args.format)
+    print(f"[OK] {args.src} -> {args.dst} ({fmt}, {os.path.getsize(args.dst)} bytes)")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+from types import MappingProxyType
+
+from utils.storage import COLLECTIONS, PAGE_SIZE, CorruptDataError
+from utils.products import ProductIndex, ProductSearch
+
+EMPTY = MappingProxyType({})
+
+
+# -------------------- Read-only Views --------------------
+def freeze(value):
+    """Return a read-only copy: dicts become mapping proxies, lists become tuples."""
+    if isinstance(value, dict):
+        return MappingProxyType({k: freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+def thaw(value):
+    """Return a plain, mutable copy of a frozen value (for editing and saving)."""
+    if isinstance(value, (dict, MappingProxyType)):
+        return {k: thaw(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [thaw(v) for v in value]
+    return value
+
+
+# -------------------- Data Store --------------------
+class DataStore:
+    """
+    Process-wide cache of the parsed goods and debts. Sales are not
+    cached: the history is read a page at a time (page_sales, iter_sales)
+    and never parsed whole.
+
+    A dataset is re-parsed only when its storage signature changes (our own
+    writes, or the file's mtime/size for edits from outside), so screens can
+    ask for data on every enter or keystroke. Views are frozen and shared:
+    thaw() a record before changing it and write through the storage engine.
+    """
+
+    def __init__(self, storage):
+        self.storage = storage
+        self._cache = {}  # filename -> (signature, frozen document)
+        self._derived = {}  # name -> (source document, derived value)
+
+    def _get(self, filename):
+        signature = self.storage.signature(filename)
+        cached = self._cache.get(filename)
+        if cached and cached[0] == signature:
+            return cached[1]
+        try:
+            data = self.storage.load(filename, {})
+        except CorruptDataError as e:
+            print(f"[WARNING] Corrupted data: {e}")
+            data = {}
+        frozen = freeze(data)
+        self._cache[filename] = (signature, frozen)
+        return frozen
+
+    def _records(self, filename):
+        doc = self._get(filename)
+        if isinstance(doc, tuple):
+            return doc
+        return doc.get(COLLECTIONS[filename], ())
+
+    def goods(self):
+        """Read-only mapping of product name -> product."""
+        goods = self._get("goods.json")
+        return goods if isinstance(goods, MappingProxyType) else EMPTY
+
+    def debts(self):
+        """Read-only tuple of debt records, oldest first."""
+        return self._records("debts.json")
+
+    def iter_sales(self, newest_first=False):
+        """
+        Read-only sales one at a time, streamed from storage without parsing
+        the whole file, so a caller after the first few records stops
+        reading early.
+        """
+        try:
+            for record in self.storage.iter_sales(newest_first):
+                yield freeze(record)
+        except CorruptDataError as e:
+            print(f"[WARNING] Corrupted data: {e}")
+
+    def page_sales(self, before=None, limit=PAGE_SIZE, product="", date=""):
+        """
+        Read-only tuple with one page of the transaction history, newest
+        first by (date, id) and below the `before` key (see
+        JsonStorage.page_sales). Storage builds the page, streaming the JSON
+        files with only `limit` sales held.
+        """
+        try:
+            return freeze(self.storage.page_sales(before, limit, product, date))
+        except CorruptDataError as e:
+            print(f"[WARNING] Corrupted data: {e}")
+            return ()
+
+    def _derive(self, name, source, build):
+        """Return a value computed from `source`, rebuilt only when `source` was re-parsed."""
+        cached = self._derived.get(name)
+        if cached and cached[0] is source:
+            return cached[1]
+        value = build(source)
+        self._derived[name] = (source, value)
+        return value
+
+    # -------------------- Indexes --------------------
+    def product_index(self):
+        """Case/space/Unicode-insensitive product lookup over the current goods."""
+        return self._derive("products", self.goods(), ProductIndex)
+
+    def product_search(self):
+        """Prefix/substring name search over the current goods (see utils.products.ProductSearch)."""
+        return self._derive("search", self.goods(), ProductSearch)
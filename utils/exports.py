@@ -0,0 +1,122 @@
+"""
+Background queue for exports (receipt images, CSV files).
+
+    app.exports.submit(job, on_done, on_error)
+
+The same class runs the history pages (app.pages) on a worker of their
+own, so a long export never holds up scrolling.
+
+`job` runs on a worker thread and must not touch widgets; on_done(result)
+or on_error(exception) is then called on the main thread through
+Clock.schedule_once.
+
+Also home to the CSV writers, which run as such jobs.
+"""
+import os
+import csv
+import gzip
+from concurrent.futures import ThreadPoolExecutor
+
+from kivy.clock import Clock
+
+WORKERS = 2
+
+CSV_HEADER = [
+    "Buyer", "Product", "Quantity", "Total Price",
+    "Amount Paid", "Debt", "Date", "Payment History"
+]
+
+
+class ExportQueue:
+    def __init__(self, workers=WORKERS, name="exports"):
+        self.name = name
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+
+    def submit(self, job, on_done, on_error=None):
+        future = self._executor.submit(job)
+        future.add_done_callback(
+            lambda f: Clock.schedule_once(lambda dt: self._finish(f, on_done, on_error))
+        )
+        return future
+
+    def _finish(self, future, on_done, on_error):
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is None:
+            on_done(future.result())
+            return
+        print(f"[ERROR] Job on the {self.name} queue failed: {error}")
+        if on_error:
+            on_error(error)
+
+    def close(self):
+        """Let queued exports finish writing their files."""
+        self._executor.shutdown(wait=True)
+
+
+# -------------------- Sales CSV --------------------
+def legacy_key(record):
+    """What ties a debt saved before sale ids to its sale."""
+    return (record.get("buyer"), record.get("product"), record.get("date"))
+
+
+def payment_histories(debts):
+    """
+    Payment history of each sale, looked up by history_for(). Debts point
+    at their sale through sale_id; older debts are matched on buyer,
+    product and date instead.
+    """
+    histories = {}
+    for debt in debts:
+        key = debt.get("sale_id") or legacy_key(debt)
+        histories[key] = debt.get("history", ())
+    return histories
+
+
+def history_for(txn, histories):
+    history = histories.get(txn.get("id")) if txn.get("id") else None
+    if history is None:
+        history = histories.get(legacy_key(txn), ())
+    return history or txn.get("history", ())
+
+
+def sale_row(txn, history=()):
+    history_text = "; ".join([f"{h['date']} → ₦{h['paid']:.2f}" for h in history])
+    return [
+        txn["buyer"],
+        txn["product"],
+        txn["quantity"],
+        txn.get("total_price", txn["amount_paid"] + txn["debt"]),
+        txn["amount_paid"],
+        txn["debt"],
+        txn["date"],
+        history_text
+    ]
+
+
+def write_sales_csv(path, sales, histories=None, compress=False):
+    """
+    Write `sales` (any iterable, consumed once) as CSV rows to `path`,
+    gzipped when `compress`. Rows go straight to the file, so memory does
+    not grow with the number of sales. The file is written next to `path`
+    and renamed into place, so a failed export leaves no partial file.
+    Returns the number of sales written.
+    """
+    histories = histories or {}
+    tmp = f"{path}.part"
+    opener = gzip.open if compress else open
+    count = 0
+    try:
+        with opener(tmp, "wt", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(CSV_HEADER)
+            for txn in sales:
+                writer.writerow(sale_row(txn, history_for(txn, histories)))
+                count += 1
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return count
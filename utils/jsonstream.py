@@ -0,0 +1,242 @@
+"""
+Streaming readers for the record lists in JSON data files.
+
+    with open("transactions.json", "rb") as f:
+        for sale in iter_collection(f, "sales"):
+            ...
+
+iter_collection() walks the document front to back, parsing one record at
+a time with the C decoder (json.JSONDecoder.raw_decode) over a buffer that
+is refilled in chunks and trimmed as records are consumed.
+iter_collection_reversed() reads the file from the end and yields the
+newest records first, so the latest screenful costs the same however
+long the history is. Both accept the app layout ({"sales": [...]}) and the
+webapp's bare lists, pretty or compact, and stop reading as soon as the
+caller stops iterating.
+"""
+import re
+import json
+import codecs
+
+CHUNK_SIZE = 64 * 1024
+WINDOW = 512    # first stretch scanned when matching brackets backwards (doubles as needed)
+WHITESPACE = " \t\r\n"
+_NUMBER_TAIL = re.compile(r"[0-9.eE+-]*\Z")   # what a number cut at the end of the buffer can leave
+
+_decoder = json.JSONDecoder()
+
+
+# -------------------- Forward --------------------
+class _Reader:
+    """Text buffer over a binary file, refilled as the parser needs more."""
+
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+        self._utf8 = codecs.getincrementaldecoder("utf-8-sig")()
+
+    def fill(self):
+        if self.eof:
+            return False
+        if self.pos > self.chunk_size:
+            self.text = self.text[self.pos:]  # drop what was consumed
+            self.pos = 0
+        chunk = self.f.read(self.chunk_size)
+        self.text += self._utf8.decode(chunk, final=not chunk)
+        self.eof = not chunk
+        return True
+
+    def peek(self):
+        """Next non-whitespace character, or "" at the end of the file."""
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, chars):
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError(f"expected one of {chars!r}, found {char or 'end of file'!r}")
+        self.pos += 1
+        return char
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError:
+                if self.fill():
+                    continue  # value runs into the next chunk
+                raise
+            if isinstance(value, (int, float)) and _NUMBER_TAIL.match(self.text, end) and self.fill():
+                continue  # a number could go on in the next chunk ("12." decodes as 12)
+            self.pos = end
+            return value
+
+
+def iter_collection(f, key, chunk_size=CHUNK_SIZE):
+    """Yield the records of document[key] (or of a bare list) from a binary file, oldest first."""
+    reader = _Reader(f, chunk_size)
+    if reader.expect("{[") == "{":
+        while True:
+            if reader.peek() == "}":
+                return
+            name = reader.value()
+            reader.expect(":")
+            if name == key and reader.peek() == "[":
+                reader.pos += 1
+                break
+            reader.value()  # another entry: parse and drop it
+            if reader.expect(",}") == "}":
+                return
+    if reader.peek() == "]":
+        return
+    while True:
+        yield reader.value()
+        if reader.expect(",]") == "]":
+            return
+
+
+# -------------------- Backward --------------------
+_QUOTE, _BACKSLASH = ord('"'), ord("\\")
+_OPEN, _CLOSE = b"{[", b"}]"
+_SPACE = WHITESPACE.encode()
+_STRUCTURE = re.compile(rb'["{}\[\]]')
+
+
+class _TailReader:
+    """Bytes buffer over the end of a file, extended backwards in chunks. Offsets are absolute."""
+
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        f.seek(0, 2)
+        self.start = f.tell()   # file offset of buf[0]
+        self.buf = b""
+
+    def fill(self):
+        if self.start == 0:
+            return False
+        size = min(self.chunk_size, self.start)
+        self.start -= size
+        self.f.seek(self.start)
+        self.buf = self.f.read(size) + self.buf
+        return True
+
+    def at(self, offset):
+        """Byte at `offset`, or -1 before the start of the file."""
+        while offset < self.start:
+            if not self.fill():
+                return -1
+        return self.buf[offset - self.start]
+
+    def skip_space(self, offset):
+        while offset >= 0 and self.at(offset) in _SPACE:
+            offset -= 1
+        return offset
+
+    def quote_before(self, offset):
+        """Offset of the nearest unescaped '"' before `offset` (an opening quote)."""
+        while True:
+            found = self.buf.rfind(b'"', 0, offset - self.start)
+            if found < 0:
+                if not self.fill():
+                    raise ValueError("unterminated string")
+                continue
+            offset = self.start + found
+            backslashes = 0
+            while self.at(offset - backslashes - 1) == _BACKSLASH:
+                backslashes += 1
+            if backslashes % 2 == 0:
+                return offset
+
+    def value_start(self, end):
+        """Offset of the '{' or '[' matching the closing bracket at `end`."""
+        depth = 0
+        limit = end + 1     # everything before this is still to be scanned
+        window = WINDOW
+        while True:
+            while limit - window < self.start and self.fill():
+                pass
+            low = max(self.start, limit - window)
+            hits = [self.start + m.start() for m in
+                    _STRUCTURE.finditer(self.buf, low - self.start, limit - self.start)]
+            for hit in reversed(hits):
+                if hit >= limit:
+                    continue  # inside a string jumped over below
+                char = self.at(hit)
+                if char == _QUOTE:
+                    limit = self.quote_before(hit)
+                    continue
+                limit = hit
+                if char in _CLOSE:
+                    depth += 1
+                else:
+                    depth -= 1
+                    if depth == 0:
+                        return hit
+            if low == 0:
+                raise ValueError("unbalanced brackets")
+            limit = min(limit, low)
+            window *= 2
+
+    def slice(self, begin, end):
+        return self.buf[begin - self.start:end - self.start]
+
+    def trim(self, offset):
+        """Forget everything from `offset` on (already yielded) once it adds up to a chunk."""
+        if len(self.buf) - (offset - self.start) > self.chunk_size:
+            self.buf = self.buf[:offset - self.start]
+
+
+def iter_collection_reversed(f, key, chunk_size=CHUNK_SIZE):
+    """
+    Yield the records of document[key] (or of a bare list) newest first.
+    The list must be the document's last entry, as the app writes it;
+    ValueError is raised once the reader finds it belongs to another key.
+    Records must be objects.
+    """
+    tail = _TailReader(f, chunk_size)
+    offset = tail.skip_space(tail.start - 1)
+    in_dict = tail.at(offset) == ord("}")
+    if in_dict:
+        offset = tail.skip_space(offset - 1)
+        if tail.at(offset) == ord("{"):
+            return  # empty document
+    if tail.at(offset) != ord("]"):
+        raise ValueError(f"{key!r} is not the last entry of the document")
+
+    offset = tail.skip_space(offset - 1)
+    while tail.at(offset) != ord("["):
+        if tail.at(offset) != ord("}"):
+            raise ValueError("only object records can be read backwards")
+        begin = tail.value_start(offset)
+        yield json.loads(tail.slice(begin, offset + 1))
+        tail.trim(begin)
+        offset = tail.skip_space(begin - 1)
+        if tail.at(offset) == ord(","):
+            offset = tail.skip_space(offset - 1)
+        elif tail.at(offset) != ord("["):
+            raise ValueError("expected ',' or '[' between records")
+
+    # Reached the opening bracket: check whose list this was.
+    offset = tail.skip_space(offset - 1)
+    if not in_dict:
+        if offset != -1:
+            raise ValueError("trailing list is not the document")
+        return
+    if tail.at(offset) != ord(":"):
+        raise ValueError("list is not a document entry")
+    offset = tail.skip_space(offset - 1)
+    if tail.at(offset) != _QUOTE:
+        raise ValueError("list is not a document entry")
+    begin = tail.quote_before(offset)
+    if json.loads(tail.slice(begin, offset + 1)) != key:
+        raise ValueError(f"the last entry of the document is not {key!r}")
@@ -1,8 +1,8 @@
 import os
-import json
 
 # -------------------- Base Paths --------------------
-USERDATA_PATH = "/storage/emulated/0/InvoiceApp/user_data"
+# INVOICEAPP_DATA_DIR overrides the phone location (desktop runs, benchmarks).
+USERDATA_PATH = os.environ.get("INVOICEAPP_DATA_DIR", "/storage/emulated/0/InvoiceApp/user_data")
 
 # -------------------- Default JSON Content --------------------
 JSON_FILES = {
@@ -15,6 +15,16 @@ JSON_FILES = {
 EXPORT_DEBTS_PATH = os.path.join(USERDATA_PATH, "debtor_images")
 EXPORT_TXNS_PATH = os.path.join(USERDATA_PATH, "transaction_images")
 
+# -------------------- Caches --------------------
+THUMBNAILS_PATH = os.path.join(USERDATA_PATH, ".thumbnails")
+
+# -------------------- Resolver State --------------------
+# The layout is checked/created on first use, not at import, and then
+# trusted for the rest of the process. Call reset_layout() after the
+# folder was removed underneath us to have it re-created on next use.
+_layout_ready = False
+_path_cache = {}
+
 
 # -------------------- Helper Functions --------------------
 def ensure_dir(path):
@@ -31,33 +41,56 @@ def ensure_file(path, default_content="{}"):
     return path
 
 
-def ensure_all_files():
-    """Ensure all default JSON files exist."""
+def ensure_all_files(force=False):
+    """Ensure all default JSON files and export folders exist (once per process)."""
+    global _layout_ready
+    if _layout_ready and not force:
+        return
     ensure_dir(USERDATA_PATH)
     for filename, default_content in JSON_FILES.items():
         ensure_file(os.path.join(USERDATA_PATH, filename), default_content)
     ensure_dir(EXPORT_DEBTS_PATH)
     ensure_dir(EXPORT_TXNS_PATH)
+    _layout_ready = True
+
+
+def reset_layout():
+    """Forget the cached layout so the next lookup checks the disk again."""
+    global _layout_ready
+    _layout_ready = False
+    _path_cache.clear()
 
 
 # -------------------- Get File Path --------------------
 def get_file_path(filename=None):
     """
     Return the full path for a JSON file in user_data.
-    Auto-creates the file if missing.
+    The folder layout is created on the first call only.
     """
-    ensure_all_files()
-    if filename is None or filename == "":
-        return USERDATA_PATH
-    if filename not in JSON_FILES:
+    filename = filename or ""
+    if filename and filename not in JSON_FILES:
         raise ValueError(f"Unknown JSON file requested: {filename}")
-    return os.path.join(USERDATA_PATH, filename)
+    path = _path_cache.get(filename)
+    if path is None or not _layout_ready:
+        ensure_all_files()
+        path = os.path.join(USERDATA_PATH, filename) if filename else USERDATA_PATH
+        _path_cache[filename] = path
+    return path
 
 
 # -------------------- Direct Constants --------------------
-GOODS_JSON_PATH = get_file_path("goods.json")
-TRANSACTIONS_JSON_PATH = get_file_path("transactions.json")
-DEBTS_JSON_PATH = get_file_path("debts.json")
+_CONSTANTS = {
+    "GOODS_JSON_PATH": "goods.json",
+    "TRANSACTIONS_JSON_PATH": "transactions.json",
+    "DEBTS_JSON_PATH": "debts.json",
+}
+
+
+def __getattr__(name):
+    # GOODS_JSON_PATH and friends resolve lazily, so importing does no I/O.
+    if name in _CONSTANTS:
+        return get_file_path(_CONSTANTS[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # -------------------- Export Path --------------------
@@ -65,8 +98,11 @@ def get_export_path(export_type="transactions"):
     """
     Returns the path for exported images.
     export_type: 'transactions' or 'debts'
+    The folder is checked on every call (one makedirs), so an export
+    folder deleted while the app runs is created again.
     """
+    ensure_all_files()
     if export_type == "debts":
         return ensure_dir(EXPORT_DEBTS_PATH)
     else:
-        return ensure_dir(EXPORT_TXNS_PATH)
\ No newline at end of file
+        return ensure_dir(EXPORT_TXNS_PATH)
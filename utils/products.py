@@ -0,0 +1,86 @@
+import unicodedata
+from bisect import bisect_left
+
+
+# -------------------- Key Normalisation --------------------
+def normalize_key(name):
+    """Lookup form of a product name: Unicode NFC, casefolded, whitespace collapsed."""
+    name = unicodedata.normalize("NFC", name or "")
+    return " ".join(unicodedata.normalize("NFC", name.casefold()).split())
+
+
+# -------------------- Product Index --------------------
+class ProductIndex:
+    """
+    Normalised name -> goods.json key, so "  rice ", "Rice" and "RICE"
+    all find the same product in O(1). Build it from the current goods
+    mapping; DataStore.product_index() keeps one in step with the file.
+    """
+
+    def __init__(self, goods=()):
+        self._keys = {}
+        for name in goods:
+            self.add(name)
+
+    def add(self, name):
+        self._keys.setdefault(normalize_key(name), name)
+
+    def remove(self, name):
+        key = normalize_key(name)
+        if self._keys.get(key) == name:
+            del self._keys[key]
+
+    def lookup(self, name):
+        """Return the stored product key matching `name`, or None."""
+        return self._keys.get(normalize_key(name))
+
+    def __contains__(self, name):
+        return normalize_key(name) in self._keys
+
+    def __len__(self):
+        return len(self._keys)
+
+
+# -------------------- Product Search --------------------
+class ProductSearch:
+    """
+    Name search over the goods for pickers. Prefix matches come from a
+    sorted list of normalised names (bisect); substring matches from an
+    index of every 1-3 character slice of each name, so a keystroke only
+    checks the names that share the query's rarest n-gram. Build it
+    from the goods mapping; DataStore.product_search() keeps one current.
+    """
+
+    GRAM = 3
+
+    def __init__(self, goods=()):
+        self.keys = list(goods)                         # goods order, for an empty query
+        self._sorted = sorted((normalize_key(name), i) for i, name in enumerate(self.keys))
+        self._names = [name for name, _ in self._sorted]
+        self._grams = {}                                # n-gram -> positions in _sorted
+        for position, (name, _) in enumerate(self._sorted):
+            for size in range(1, self.GRAM + 1):
+                for start in range(len(name) - size + 1):
+                    self._grams.setdefault(name[start:start + size], set()).add(position)
+
+    def prefix(self, query):
+        """Positions in _sorted of names starting with the normalised `query`."""
+        start = bisect_left(self._names, query)
+        end = start
+        while end < len(self._names) and self._names[end].startswith(query):
+            end += 1
+        return range(start, end)
+
+    def search(self, query):
+        """goods keys matching `query`: prefix matches first, then other substrings, each A-Z."""
+        query = normalize_key(query)
+        if not query:
+            return list(self.keys)
+        prefix = self.prefix(query)
+        grams = [query[i:i + self.GRAM] for i in range(max(len(query) - self.GRAM + 1, 1))]
+        candidates = min((self._grams.get(gram, set()) for gram in grams), key=len)
+        inside = sorted(
+            position for position in candidates
+            if position not in prefix and query in self._names[position]
+        )
+        return [self.keys[self._sorted[position][1]] for position in (*prefix, *inside)]
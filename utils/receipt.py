@@ -0,0 +1,108 @@
+"""
+Receipt images for the debt and transaction exports.
+
+PIL is imported on the first render, not when a screen loads. Fonts are
+resolved once per size (the first candidate that loads wins, falling
+back to PIL's built-in font), and the line positions of a receipt depend
+only on its style and line count, so both are cached across exports.
+"""
+import threading
+from io import BytesIO
+from collections import namedtuple
+from functools import lru_cache
+
+# Tried in order; Android has no arial.ttf, but Roboto has the ₦ glyph.
+FONT_CANDIDATES = (
+    "arial.ttf",
+    "DejaVuSans.ttf",
+    "/system/fonts/Roboto-Regular.ttf",
+    "/system/fonts/DroidSans.ttf",
+)
+
+ReceiptStyle = namedtuple("ReceiptStyle", "width background color font_size line_height margin")
+
+# Export workers share the cached fonts; FreeType faces are not thread-safe.
+_render_lock = threading.Lock()
+
+DEBT_STYLE = ReceiptStyle(700, (30, 30, 30), "white", 18, 30, 20)
+TRANSACTION_STYLE = ReceiptStyle(800, "white", "black", 22, 32, 20)
+
+
+# -------------------- PIL & Fonts --------------------
+@lru_cache(maxsize=None)
+def _pil():
+    from PIL import Image, ImageDraw, ImageFont
+    return Image, ImageDraw, ImageFont
+
+
+@lru_cache(maxsize=None)
+def load_font(size):
+    """The first candidate font that loads at `size`, or PIL's default."""
+    ImageFont = _pil()[2]
+    for name in FONT_CANDIDATES:
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    print(f"[WARNING] No TrueType font found, using PIL's default for size {size}")
+    return ImageFont.load_default()
+
+
+# -------------------- Layout --------------------
+@lru_cache(maxsize=64)
+def layout(style, count):
+    """((width, height), y of each line) for `count` lines in `style`."""
+    positions = tuple(style.margin + i * style.line_height for i in range(count))
+    height = style.margin * 2 + style.line_height * max(count, 1)
+    return (style.width, height), positions
+
+
+def debt_lines(debt, hidden=()):
+    lines = [f"{key.capitalize()}: {value}" for key, value in debt.items() if key not in hidden]
+    history = debt.get("history", [])
+    if history:
+        lines.append("Payment History:")
+        lines.extend(f"{record['date']} → ₦{record['paid']:.2f}" for record in history)
+    return lines
+
+
+def transaction_lines(txn):
+    total_price = txn.get("total_price", txn["amount_paid"] + txn["debt"])
+    lines = [
+        f"Date: {txn['date']}",
+        f"Buyer: {txn['buyer']}",
+        f"Product: {txn['product']}",
+        f"Quantity: {txn['quantity']}",
+        f"Total Price: ₦{total_price:.2f}",
+        f"Amount Paid: ₦{txn['amount_paid']:.2f}",
+        f"Debt: ₦{txn['debt']:.2f}",
+    ]
+    history = txn.get("history", [])
+    if history:
+        lines.append("Payment History:")
+        lines.extend(f"{h['date']} → ₦{h['paid']:.2f}" for h in history)
+    return lines
+
+
+# -------------------- Rendering --------------------
+def render(lines, style):
+    """Draw the lines onto a new PIL image sized to fit them."""
+    Image, ImageDraw, _ = _pil()
+    with _render_lock:
+        font = load_font(style.font_size)
+        size, positions = layout(style, len(lines))
+        img = Image.new("RGB", size, style.background)
+        draw = ImageDraw.Draw(img)
+        for line, y in zip(lines, positions):
+            draw.text((style.margin, y), line, fill=style.color, font=font)
+    return img
+
+
+def export_png(lines, style, path):
+    """Render and encode once, write the file, and return the PNG bytes (for a preview texture)."""
+    buffer = BytesIO()
+    render(lines, style).save(buffer, format="PNG")
+    data = buffer.getvalue()
+    with open(path, "wb") as f:
+        f.write(data)
+    return data
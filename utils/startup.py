@@ -0,0 +1,58 @@
+"""
+Startup timeline: what each import and screen constructor cost.
+
+    from utils.startup import timeline
+
+    with timeline.step("import kivy"):
+        from kivy.app import App
+
+Steps are printed as they finish (set INVOICEAPP_STARTUP_LOG=0 to keep
+quiet) and the whole timeline can be written out with timeline.dump(path).
+Offsets count from the first import of this module, so main.py imports
+it before anything else.
+"""
+import os
+import time
+from contextlib import contextmanager
+
+
+class Timeline:
+    def __init__(self, verbose=True):
+        self.origin = time.perf_counter()
+        self.verbose = verbose
+        self.entries = []   # (label, offset, duration) in seconds
+
+    @contextmanager
+    def step(self, label):
+        """Time the body of a with block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._record(label, start, time.perf_counter() - start)
+
+    def mark(self, label):
+        """Record an instant, e.g. the first frame."""
+        self._record(label, time.perf_counter(), 0.0)
+
+    def _record(self, label, start, duration):
+        offset = start - self.origin
+        self.entries.append((label, offset, duration))
+        if self.verbose:
+            print(f"[STARTUP] +{offset * 1000:7.1f} ms  {label} ({duration * 1000:.1f} ms)")
+
+    def report(self):
+        lines = [f"{'offset ms':>10} {'took ms':>9}  step"]
+        for label, offset, duration in self.entries:
+            lines.append(f"{offset * 1000:10.1f} {duration * 1000:9.1f}  {label}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path):
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(self.report())
+        except OSError as e:
+            print(f"[WARNING] Could not write startup timeline: {e}")
+
+
+timeline = Timeline(verbose=os.environ.get("INVOICEAPP_STARTUP_LOG", "1") != "0")
@@ -0,0 +1,1537 @@
+import os
+import re
+import glob
+import gzip
+import json
+import heapq
+import uuid
+import sqlite3
+import threading
+from collections import OrderedDict
+from itertools import chain
+from datetime import datetime
+
+from utils import codec, jsonstream
+
+# -------------------- Collections --------------------
+# Files holding record lists, and the key the list lives under in the
+# app layout ({"sales": [...]}). The webapp keeps bare lists instead.
+COLLECTIONS = {
+    "transactions.json": "sales",
+    "debts.json": "debts",
+}
+
+DATASETS = ("goods.json", "transactions.json", "debts.json")
+
+DEFAULT_ENGINE = "sqlite"
+DEFAULT_FORMAT = "pretty"
+
+
+class CorruptDataError(ValueError):
+    """Raised when a data file exists but cannot be parsed."""
+
+
+def records_of(doc, filename):
+    """Return the record list held by a collection document, creating it if needed."""
+    if isinstance(doc, list):
+        return doc
+    return doc.setdefault(COLLECTIONS[filename], [])
+
+
+def _read_jsonl(path, opener=open):
+    """Records of a JSON-lines file, stopping at a torn final line."""
+    records = []
+    if not os.path.exists(path):
+        return records
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if not line.endswith("\n"):
+                break  # torn final write
+            records.append(json.loads(line))
+    return records
+
+
+def _contains(records, record):
+    if record.get("id"):
+        return any(existing.get("id") == record["id"] for existing in records)
+    return record in records
+
+
+def _fsync_path(path):
+    """fsync a file or folder by path (skipped when it is gone, or for folders on Windows)."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except (FileNotFoundError, PermissionError):
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def new_id():
+    """Stable unique id for a new sale or debt record."""
+    return uuid.uuid4().hex
+
+
+def ensure_ids(storage):
+    """
+    Give every sale and debt that has no id one (one-off backfill of older
+    data). It reads both collections whole, so it runs once per data folder
+    and records that in the engine's meta values.
+    """
+    if storage.meta("ids_assigned"):
+        return
+    for filename in COLLECTIONS:
+        doc = storage.load(filename, {})
+        missing = [r for r in records_of(doc, filename) if not r.get("id")]
+        if not missing:
+            continue
+        for record in missing:
+            record["id"] = new_id()
+        storage.save(filename, doc)
+        print(f"[INFO] Assigned ids to {len(missing)} records in {filename}")
+    storage.set_meta("ids_assigned", "1")
+
+
+# -------------------- Sale Queries --------------------
+# Date searches starting with a year are prefix searches the date index can answer
+DATE_PREFIX = re.compile(r"\d{4}(-|$)")
+PAGE_SIZE = 50
+
+
+def in_date_range(date, start="", end=""):
+    """True when `date` falls from `start` through `end`; both are date prefixes and "" leaves that side open."""
+    return date >= start and (not end or date[:len(end)] <= end)
+
+
+def date_prefix(query):
+    """The part of a date search the date index can use ("" when it does not start with a year)."""
+    return query if DATE_PREFIX.match(query) else ""
+
+
+def buyer_of(record):
+    """Who a sale or debt is for: the app stores "buyer", the webapp "customer"."""
+    return record.get("buyer", record.get("customer"))
+
+
+def sale_key(record):
+    """Order of the transaction history: (date, id). Pages run newest first, from one key down."""
+    return (record.get("date") or "", record.get("id") or "")
+
+
+def sale_matches(record, product="", date=""):
+    """The history filters: part of the product name (any case) and part of the date."""
+    if product and product.lower() not in (record.get("product") or "").lower():
+        return False
+    return not date or date in (record.get("date") or "")
+
+
+def page_of(records, before=None, limit=PAGE_SIZE, product="", date=""):
+    """The newest `limit` matching records below the `before` key, keeping only `limit` at a time."""
+    before = tuple(before) if before is not None else None
+    return heapq.nlargest(
+        limit,
+        (r for r in records if (before is None or sale_key(r) < before) and sale_matches(r, product, date)),
+        key=sale_key,
+    )
+
+
+# -------------------- Unit of Work --------------------
+class UnitOfWork:
+    """
+    Changes staged against a storage engine and committed in one atomic step.
+
+        with storage.transaction() as tx:
+            tx.put_product(name, product)
+            tx.append("transactions.json", sale)
+
+    Nothing is written if the block raises.
+    """
+
+    def __init__(self, storage):
+        self.storage = storage
+        self.saves = {}       # filename -> whole document
+        self.products = {}    # name -> product
+        self.appends = []     # (filename, record)
+        self.updates = []     # (filename, record) replacing the stored record with the same id
+
+    def save(self, filename, data):
+        self.saves[filename] = data
+
+    def put_product(self, name, product):
+        self.products[name] = product
+
+    def append(self, filename, record):
+        self.appends.append((filename, record))
+
+    def update(self, filename, record):
+        self.updates.append((filename, record))
+
+    def commit(self):
+        if self.saves or self.products or self.appends or self.updates:
+            self.storage.commit(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        return False
+
+
+# -------------------- JSON Engine --------------------
+class JsonStorage:
+    """
+    Whole-file documents, one file per dataset (the original layout).
+    `fmt` picks the encoding from utils.codec: pretty JSON (default),
+    compact JSON, or binary frames stored as <name>.ivb. Loads detect the
+    encoding, and a binary store falls back to the .json file until its
+    first write, so switching formats needs no migration step.
+
+    Commits go through a write-ahead log (commit.log.jsonl). Each commit
+    appends one line holding only its changes (product upserts, appended
+    records, documents saved whole) and fsyncs it: that is the commit
+    point, and the only fsync. The targets are then rewritten without
+    fsync. Replaying a line twice changes nothing, as appends are matched
+    by id, so the log is replayed on startup and only checkpointed (data
+    files and folders fsynced, log removed) once it passes
+    CHECKPOINT_BYTES, before a write that bypasses it, and on close(). A
+    torn last line was never committed and is dropped.
+    """
+
+    name = "json"
+    COMMIT_LOG = "commit.log.jsonl"
+    LEGACY_COMMIT_LOG = "commit.log.json"   # whole-document log of older versions
+    CHECKPOINT_BYTES = 256 * 1024
+    META_FILE = "meta.json"     # small key/value markers, e.g. one-off upgrades that have run
+    APPEND_ONLY = ()    # files whose staged appends go to _append_line(), not into whole documents
+    DATE_INDEXED = False  # sales_by_date() reads less than the whole file
+
+    def __init__(self, data_dir, fmt=None):
+        self.data_dir = data_dir
+        self.fmt = fmt or DEFAULT_FORMAT
+        if self.fmt not in codec.FORMATS:
+            raise ValueError(f"Unknown data format: {self.fmt}")
+        self._lock = threading.RLock()
+        self._revisions = {}
+        os.makedirs(self.data_dir, exist_ok=True)
+        self._recover()
+
+    def path(self, filename):
+        return os.path.join(self.data_dir, filename)
+
+    def data_path(self, filename):
+        """Where a dataset lives in the configured format (goods.json -> goods.ivb for binary)."""
+        return self.path(os.path.splitext(filename)[0] + codec.EXTENSIONS[self.fmt])
+
+    def _touch(self, filename):
+        self._revisions[filename] = self._revisions.get(filename, 0) + 1
+
+    def _stat(self, path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def signature(self, filename):
+        """
+        Cheap change marker for a dataset: our own write count plus the
+        file's mtime and size, so edits from outside the process show too.
+        """
+        return (self._revisions.get(filename, 0), self._stat(self.data_path(filename)))
+
+    def load(self, filename, default=None):
+        """Load a document. Missing files give `default`; unreadable ones raise CorruptDataError."""
+        path = self.data_path(filename)
+        if not os.path.exists(path):
+            path = self.path(filename)  # not written in this format yet
+            if not os.path.exists(path):
+                return {} if default is None else default
+        try:
+            with open(path, "rb") as f:
+                return codec.decode(f.read())
+        except (OSError, ValueError) as e:
+            raise CorruptDataError(f"{path}: {e}") from e
+
+    def save(self, filename, data):
+        with self._lock:
+            self._checkpoint()  # a logged commit replayed later must not undo this write
+            self._replace_doc(filename, data)
+
+    def iter_sales(self, newest_first=False):
+        """
+        Yield sales one at a time, streamed from the file (utils.jsonstream)
+        instead of parsing it whole; stop iterating to stop reading.
+        """
+        with self._lock:
+            f = self._open_sales()
+        if f is None:
+            return
+        with f:
+            yield from self._stream_sales(f, newest_first)
+
+    def _open_sales(self):
+        # An open handle keeps reading the version it opened across os.replace().
+        for path in (self.data_path("transactions.json"), self.path("transactions.json")):
+            try:
+                return open(path, "rb")
+            except FileNotFoundError:
+                continue
+        return None
+
+    def _stream_sales(self, f, newest_first):
+        try:
+            if codec.detect(f.read(len(codec.MAGIC))) == "binary":
+                f.seek(0)
+                yield from codec.iter_records(f.read(), COLLECTIONS["transactions.json"], newest_first)
+                return
+            f.seek(0)
+            read = jsonstream.iter_collection_reversed if newest_first else jsonstream.iter_collection
+            yield from read(f, COLLECTIONS["transactions.json"])
+        except (OSError, ValueError) as e:
+            raise CorruptDataError(f"{f.name}: {e}") from e
+
+    def sales_by_date(self, prefix=""):
+        """Yield the sales whose date starts with `prefix` (YYYY, YYYY-MM, YYYY-MM-DD...), oldest first."""
+        return self.sales_between(prefix, prefix)
+
+    def sales_between(self, start="", end=""):
+        """Yield the sales dated from `start` through `end` (date prefixes, "" = open), oldest first."""
+        for record in self.iter_sales():
+            if in_date_range(record.get("date", ""), start, end):
+                yield record
+
+    def page_sales(self, before=None, limit=PAGE_SIZE, product="", date=""):
+        """
+        One page of the transaction history: up to `limit` sales matching
+        the filters, newest first by sale_key(), strictly below the `before`
+        key (None starts at the newest). Pass the key of a page's last sale
+        to get the next one. The whole file is streamed, but only `limit`
+        sales are held at a time.
+        """
+        prefix = date_prefix(date)
+        return page_of(self.sales_between(prefix, prefix), before, limit, product, date)
+
+    def append(self, filename, record):
+        """Add one record to a collection file."""
+        with self._lock:
+            doc = self.load(filename, {})
+            records_of(doc, filename).append(record)
+            self.save(filename, doc)
+
+    def put_product(self, name, product):
+        """Insert or replace a single product in goods.json."""
+        with self._lock:
+            goods = self.load("goods.json", {})
+            goods[name] = product
+            self.save("goods.json", goods)
+
+    def update_record(self, filename, record):
+        """
+        Replace the stored record that has the same id as `record` (KeyError
+        if none). Only the record goes to the commit log; the document is
+        still rewritten whole, as in every whole-file engine.
+        """
+        with self.transaction() as tx:
+            tx.update(filename, record)
+
+    def meta(self, key):
+        """A value stored with set_meta(), or None."""
+        try:
+            with open(self.path(self.META_FILE), "r", encoding="utf-8") as f:
+                return json.load(f).get(key)
+        except (OSError, ValueError, AttributeError):
+            return None
+
+    def set_meta(self, key, value):
+        with self._lock:
+            values = {}
+            if os.path.exists(self.path(self.META_FILE)):
+                try:
+                    with open(self.path(self.META_FILE), "r", encoding="utf-8") as f:
+                        values = json.load(f)
+                except ValueError:
+                    pass
+            values[key] = value
+            path = self.path(self.META_FILE)
+            with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+                json.dump(values, f, indent=4, ensure_ascii=False)
+            os.replace(f"{path}.tmp", path)
+
+    def export_json(self, dest_dir=None):
+        """Write pretty JSON copies of every dataset for humans (no-op when the data already is JSON)."""
+        dest_dir = dest_dir or self.data_dir
+        if dest_dir == self.data_dir and self.fmt != "binary":
+            return
+        _export_json(self, dest_dir)
+
+    def close(self):
+        with self._lock:
+            self._checkpoint()
+
+    # ---------- Transactions ----------
+    def transaction(self):
+        return UnitOfWork(self)
+
+    def commit(self, uow):
+        with self._lock:
+            entry = {"replace": uow.saves, "products": uow.products, "append": uow.appends, "update": uow.updates}
+            changes = self._plan([entry], replay=False)  # an unknown update id raises before anything is logged
+            log = self.path(self.COMMIT_LOG)
+            with open(log, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())  # the commit point, and its only fsync
+                size = f.tell()
+            self._write(*changes)
+            if size >= self.CHECKPOINT_BYTES:
+                self._checkpoint()
+
+    def _apply(self, entries, replay):
+        """Write logged commits in order, rewriting each document once."""
+        self._write(*self._plan(entries, replay))
+
+    def _plan(self, entries, replay):
+        """The documents and lines that logged commits leave behind, as (docs, lines)."""
+        docs, replaced, lines = {}, set(), []
+
+        def doc(filename):
+            if filename not in docs:
+                docs[filename] = self.load(filename, {})
+            return docs[filename]
+
+        for entry in entries:
+            for filename, data in (entry.get("replace") or {}).items():
+                docs[filename] = data
+                replaced.add(filename)
+                lines = [line for line in lines if line[0] != filename]  # the whole document supersedes them
+            if entry.get("products"):
+                doc("goods.json").update(entry["products"])
+            for filename, record in entry.get("append") or ():
+                if filename in self.APPEND_ONLY and filename not in replaced:
+                    if not (replay and self._holds(filename, record)):
+                        lines.append((filename, record))
+                    continue
+                records = records_of(doc(filename), filename)
+                if not (replay and _contains(records, record)):  # else applied before the crash
+                    records.append(record)
+            for filename, record in entry.get("update") or ():
+                if filename in self.APPEND_ONLY and filename not in replaced:
+                    # rewritten whole: this batch's pending lines go into the document first
+                    records_of(doc(filename), filename).extend(r for f, r in lines if f == filename)
+                    lines = [line for line in lines if line[0] != filename]
+                    replaced.add(filename)
+                records = records_of(doc(filename), filename)
+                for i, existing in enumerate(records):
+                    if existing.get("id") == record["id"]:
+                        records[i] = record
+                        break
+                else:
+                    if not replay:
+                        raise KeyError(record["id"])
+        return docs, lines
+
+    def _write(self, docs, lines):
+        for filename, data in docs.items():
+            self._replace_doc(filename, data, sync=False)
+        for filename, record in lines:
+            self._append_line(filename, record, sync=False)
+
+    def _replace_doc(self, filename, data, sync=True):
+        self._write_atomic(filename, data, sync)
+
+    def _holds(self, filename, record):
+        """Whether a replayed append already reached the file (matched by id, or whole for id-less records)."""
+        return _contains(records_of(self.load(filename, {}), filename), record)
+
+    def _data_files(self):
+        """Every file a commit may have written without fsync."""
+        for filename in DATASETS:
+            yield self.data_path(filename)
+            yield self.path(filename)
+
+    def _checkpoint(self):
+        """fsync the data files and their folders, then drop the commit log they no longer need."""
+        logs = [path for path in (self.path(self.COMMIT_LOG), self.path(self.LEGACY_COMMIT_LOG))
+                if os.path.exists(path)]
+        if not logs:
+            return
+        folders = {self.data_dir}
+        for path in self._data_files():
+            folders.add(os.path.dirname(path))
+            _fsync_path(path)
+        for folder in folders:
+            _fsync_path(folder)
+        for path in logs:
+            os.remove(path)
+        _fsync_path(self.data_dir)
+
+    def _recover(self):
+        entries = []
+        legacy = self.path(self.LEGACY_COMMIT_LOG)
+        if os.path.exists(legacy):
+            try:
+                with open(legacy, "r", encoding="utf-8") as f:
+                    entries.append(json.load(f))
+            except ValueError:
+                print("[WARNING] Discarding incomplete commit log")
+        entries.extend(_read_jsonl(self.path(self.COMMIT_LOG)))  # a torn last line was never committed
+        if entries:
+            print(f"[INFO] Replaying {len(entries)} logged commit(s)")
+            self._apply(entries, replay=True)
+        self._checkpoint()
+
+    def _write_atomic(self, filename, data, sync=True):
+        path = self.data_path(filename)
+        tmp = f"{path}.tmp"
+        try:
+            f = open(tmp, "wb")
+        except FileNotFoundError:
+            os.makedirs(self.data_dir, exist_ok=True)  # folder removed while running
+            f = open(tmp, "wb")
+        with f:
+            f.write(codec.encode(data, self.fmt))
+            if sync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp, path)
+        self._touch(filename)
+
+
+# -------------------- Journal Engine --------------------
+class JournalStorage(JsonStorage):
+    """
+    JSON engine where sales are appended to transactions.jsonl (one record
+    per line, fsynced) instead of rewriting transactions.json. Readers get
+    the snapshot plus the journal tail; a background compactor folds the
+    journal into the snapshot once it grows past the thresholds.
+
+    While folding, the journal is renamed to transactions.jsonl.<N>, N being
+    the snapshot's record count before the fold. On startup a leftover
+    rotated file is folded again if the snapshot still holds N records and
+    not its first record (matched by id), and dropped otherwise, so an
+    interrupted compaction never loses or repeats sales. save() does not
+    rotate: it goes through the commit log, which replays the snapshot and
+    the emptied journal together.
+    """
+
+    name = "journal"
+    JOURNALED = ("transactions.json",)
+    APPEND_ONLY = JOURNALED
+    COMPACT_BYTES = 512 * 1024
+    COMPACT_RECORDS = 1000
+
+    def __init__(self, data_dir, fmt=None, compact_bytes=None, compact_records=None):
+        self.compact_bytes = compact_bytes or self.COMPACT_BYTES
+        self.compact_records = compact_records or self.COMPACT_RECORDS
+        self._compact_lock = threading.Lock()   # one fold (or full save) at a time
+        self._compactor = None
+        self._journal_records = {}
+        super().__init__(data_dir, fmt)
+
+    # ---------- Files ----------
+    def journal_path(self, filename):
+        return self.path(os.path.splitext(filename)[0] + ".jsonl")
+
+    def _rotated(self, filename):
+        """Rotated journals awaiting a fold, as (path, snapshot count) pairs."""
+        found = []
+        for path in glob.glob(glob.escape(self.journal_path(filename)) + ".*"):
+            suffix = path.rsplit(".", 1)[1]
+            if suffix.isdigit():
+                found.append((path, int(suffix)))
+        return sorted(found, key=lambda item: item[1])
+
+    def _data_files(self):
+        yield from super()._data_files()
+        for filename in self.JOURNALED:
+            yield self.journal_path(filename)
+
+    def _read_journal(self, path):
+        return _read_jsonl(path)
+
+    def _snapshot(self, filename):
+        doc = JsonStorage.load(self, filename, {})
+        return doc, records_of(doc, filename)
+
+    def signature(self, filename):
+        base = super().signature(filename)
+        if filename not in self.JOURNALED:
+            return base
+        with self._lock:
+            rotated = tuple(self._stat(path) for path, _ in self._rotated(filename))
+            return base + (self._stat(self.journal_path(filename)), rotated)
+
+    # ---------- Recovery ----------
+    def _recover(self):
+        for filename in self.JOURNALED:
+            self._recover_journal(filename)
+        super()._recover()
+
+    def _recover_journal(self, filename):
+        """Finish interrupted folds and cut a torn last line off the journal."""
+        with self._lock:
+            for path, count in self._rotated(filename):
+                doc, records = self._snapshot(filename)
+                tail = self._read_journal(path)
+                if len(records) == count and not (tail and _contains(records, tail[0])):
+                    records.extend(tail)
+                    self._write_atomic(filename, doc)
+                os.remove(path)
+
+            journal = self.journal_path(filename)
+            if os.path.exists(journal):
+                with open(journal, "rb+") as f:
+                    data = f.read()
+                    if data and not data.endswith(b"\n"):
+                        f.truncate(data.rfind(b"\n") + 1)
+            self._journal_records[filename] = len(self._read_journal(journal))
+
+    # ---------- Public API ----------
+    def load(self, filename, default=None):
+        if filename not in self.JOURNALED:
+            return super().load(filename, default)
+        with self._lock:
+            doc = super().load(filename, None)
+            tail = []
+            for path, _ in self._rotated(filename):
+                tail.extend(self._read_journal(path))
+            tail.extend(self._read_journal(self.journal_path(filename)))
+            if doc is None:
+                if not tail:
+                    return {} if default is None else default
+                doc = {}
+            records_of(doc, filename).extend(tail)
+            return doc
+
+    def iter_sales(self, newest_first=False):
+        """Stream the snapshot and add the journal tail (which comes first when newest_first)."""
+        filename = "transactions.json"
+        with self._lock:
+            # Snapshot handle and tail taken together, so a fold in between can't repeat sales.
+            f = self._open_sales()
+            tail = []
+            for path, _ in self._rotated(filename):
+                tail.extend(self._read_journal(path))
+            tail.extend(self._read_journal(self.journal_path(filename)))
+        if newest_first:
+            yield from reversed(tail)
+        if f is not None:
+            with f:
+                yield from self._stream_sales(f, newest_first)
+        if not newest_first:
+            yield from tail
+
+    def save(self, filename, data):
+        """Replace the whole dataset: `data` already includes the journal, so it is folded away."""
+        if filename not in self.JOURNALED:
+            return super().save(filename, data)
+        with self.transaction() as tx:  # logged: the snapshot and the emptied journal replay together
+            tx.save(filename, data)
+
+    def append(self, filename, record):
+        """Append one record as a JSONL line and fsync it: constant cost per sale."""
+        if filename not in self.JOURNALED:
+            return super().append(filename, record)
+        with self._lock:
+            self._checkpoint()
+            self._append_line(filename, record, sync=True)
+
+    def _append_line(self, filename, record, sync):
+        journal = self.journal_path(filename)
+        with open(journal, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            if sync:
+                f.flush()
+                os.fsync(f.fileno())
+            size = f.tell()
+        self._touch(filename)
+        self._journal_records[filename] += 1
+        if size >= self.compact_bytes or self._journal_records[filename] >= self.compact_records:
+            self._schedule_compaction(filename)
+
+    # ---------- Transactions ----------
+    def commit(self, uow):
+        if any(filename in self.JOURNALED for filename in chain(uow.saves, (f for f, _ in uow.updates))):
+            with self._compact_lock:
+                return super().commit(uow)
+        return super().commit(uow)
+
+    def _replace_doc(self, filename, data, sync=True):
+        self._write_atomic(filename, data, sync)
+        if filename in self.JOURNALED:
+            open(self.journal_path(filename), "w").close()
+            self._journal_records[filename] = 0
+
+    # ---------- Compaction ----------
+    def _schedule_compaction(self, filename):
+        if self._compactor and self._compactor.is_alive():
+            return
+        self._compactor = threading.Thread(target=self.compact, args=(filename,), daemon=True)
+        self._compactor.start()
+
+    def compact(self, filename="transactions.json"):
+        """Fold the journal into the snapshot. Appends keep going to a fresh journal meanwhile."""
+        with self._compact_lock:
+            with self._lock:
+                journal = self.journal_path(filename)
+                if not os.path.exists(journal) or os.path.getsize(journal) == 0:
+                    return
+                doc, records = self._snapshot(filename)
+                rotated = f"{journal}.{len(records)}"
+                os.replace(journal, rotated)
+                self._journal_records[filename] = 0
+
+            records.extend(self._read_journal(rotated))
+            path = self.data_path(filename)
+            tmp = f"{path}.compact"
+            with open(tmp, "wb") as f:
+                f.write(codec.encode(doc, self.fmt))
+                f.flush()
+                os.fsync(f.fileno())
+
+            with self._lock:
+                os.replace(tmp, path)
+                os.remove(rotated)
+            print(f"[INFO] Compacted {len(records)} records into {filename}")
+
+    def close(self):
+        if self._compactor:
+            self._compactor.join()
+        super().close()
+
+
+# -------------------- Partitioned Engine --------------------
+UNDATED = "undated"
+
+
+def partition_key(record):
+    """Month partition of a sale: the YYYY-MM of its date, or "undated"."""
+    key = (record.get("date") or "")[:7]
+    if len(key) == 7 and key[4] == "-" and key[:4].isdigit() and key[5:].isdigit():
+        return key
+    return UNDATED
+
+
+class PartitionedStorage(JsonStorage):
+    """
+    JSON engine where sales are split by month into sales/YYYY-MM.jsonl
+    (one record per line), next to a manifest (sales/manifest.json) of each
+    partition's record count, first and last date and byte size. A date
+    search reads only the partitions that can hold matching sales.
+
+    Months before the current one are sealed: gzipped to YYYY-MM.jsonl.gz
+    and not written again (a back-dated sale reopens its month until the
+    next start), so their parsed records are kept in memory. On first use
+    transactions.json is split into partitions; afterwards export_json()
+    refreshes it as a plain copy for humans and the other engines.
+    """
+
+    name = "partitioned"
+    PARTITIONED = ("transactions.json",)
+    APPEND_ONLY = PARTITIONED
+    DATE_INDEXED = True
+    PARTITION_DIR = "sales"
+    MANIFEST = "manifest.json"
+    SEALED_CACHE = 24   # parsed sealed months kept in memory
+
+    def __init__(self, data_dir, fmt=None):
+        self._manifest = None
+        self._sealed = OrderedDict()    # key -> parsed records of a sealed month
+        super().__init__(data_dir, fmt)
+
+    # ---------- Files ----------
+    def partition_dir(self):
+        return self.path(self.PARTITION_DIR)
+
+    def partition_path(self, key, sealed=False):
+        return os.path.join(self.partition_dir(), f"{key}.jsonl.gz" if sealed else f"{key}.jsonl")
+
+    def _data_files(self):
+        yield from super()._data_files()
+        for key, entry in self._manifest["partitions"].items():
+            yield self.partition_path(key, entry["sealed"])
+
+    def _manifest_path(self):
+        return os.path.join(self.partition_dir(), self.MANIFEST)
+
+    def _write_manifest(self):
+        # Not fsynced: after a crash _reconcile() rebuilds entries from the files.
+        path = self._manifest_path()
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(self._manifest, f, indent=4, ensure_ascii=False)
+        os.replace(f"{path}.tmp", path)
+
+    def _keys(self):
+        """Partition keys, oldest first (undated records come before everything else)."""
+        return sorted(self._manifest["partitions"], key=lambda key: (key != UNDATED, key))
+
+    @staticmethod
+    def _entry(records, sealed, size):
+        dates = [record.get("date", "") for record in records]
+        return {
+            "count": len(records),
+            "first": min(dates, default=""),
+            "last": max(dates, default=""),
+            "bytes": size,
+            "sealed": sealed,
+        }
+
+    def _read_partition(self, key):
+        """Records of one month, as fresh dicts the caller may change."""
+        if not self._manifest["partitions"][key]["sealed"]:
+            return _read_jsonl(self.partition_path(key))
+        records = self._sealed.get(key)
+        if records is None:
+            records = _read_jsonl(self.partition_path(key, sealed=True), gzip.open)
+            self._sealed[key] = records
+            if len(self._sealed) > self.SEALED_CACHE:
+                self._sealed.popitem(last=False)
+        self._sealed.move_to_end(key)
+        return [dict(record) for record in records]
+
+    def _write_partition(self, key, records, sealed, sync=True):
+        path = self.partition_path(key, sealed)
+        payload = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records).encode("utf-8")
+        if sealed:
+            payload = gzip.compress(payload, mtime=0)
+        with open(f"{path}.tmp", "wb") as f:
+            f.write(payload)
+            if sync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(f"{path}.tmp", path)
+        other = self.partition_path(key, not sealed)
+        if os.path.exists(other):
+            os.remove(other)
+        self._manifest["partitions"][key] = self._entry(records, sealed, len(payload))
+        self._sealed.pop(key, None)
+
+    def _drop_partition(self, key):
+        for sealed in (False, True):
+            path = self.partition_path(key, sealed)
+            if os.path.exists(path):
+                os.remove(path)
+        del self._manifest["partitions"][key]
+        self._sealed.pop(key, None)
+
+    # ---------- Recovery ----------
+    def _recover(self):
+        self._open_partitions()
+        super()._recover()
+        with self._lock:
+            self._seal_old()
+
+    def _open_partitions(self):
+        """Load the manifest, or split transactions.json into months on first use."""
+        os.makedirs(self.partition_dir(), exist_ok=True)
+        path = self._manifest_path()
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self._manifest = json.load(f)
+            except ValueError:
+                print("[WARNING] Rebuilding unreadable sales manifest")
+                self._manifest = {"shape": "dict", "partitions": {}}
+            self._reconcile()
+            return
+
+        self._manifest = {"shape": "dict", "partitions": {}}
+        try:
+            legacy = JsonStorage.load(self, "transactions.json", None)
+        except CorruptDataError as e:
+            print(f"[WARNING] Not partitioning unreadable sales file: {e}")
+            legacy = None
+        if legacy is None or not records_of(legacy, "transactions.json"):
+            # No sales yet (missing, empty or unreadable file): nothing to split
+            if isinstance(legacy, list):
+                self._manifest["shape"] = "list"
+            self._write_manifest()
+            return
+        self._write_partitions(legacy, sync=True)
+        print(f"[INFO] Split {sum(e['count'] for e in self._manifest['partitions'].values())} "
+              f"sales into {len(self._manifest['partitions'])} monthly partitions")
+
+    def _reconcile(self):
+        """Bring the manifest in line with the partition files after a crash."""
+        partitions = self._manifest["partitions"]
+        found = {}
+        for name in os.listdir(self.partition_dir()):
+            if name.endswith(".jsonl"):
+                found.setdefault(name[:-len(".jsonl")], set()).add(False)
+            elif name.endswith(".jsonl.gz"):
+                found.setdefault(name[:-len(".jsonl.gz")], set()).add(True)
+
+        changed = False
+        for key in set(partitions) - set(found):
+            del partitions[key]
+            changed = True
+        for key, kinds in found.items():
+            entry = partitions.get(key)
+            if len(kinds) == 2:
+                # Interrupted seal or unseal: the manifest says which copy is live.
+                live = bool(entry and entry["sealed"])
+                os.remove(self.partition_path(key, not live))
+                kinds = {live}
+            sealed = kinds.pop()
+            path = self.partition_path(key, sealed)
+            if entry and entry["sealed"] == sealed and entry["bytes"] == os.path.getsize(path):
+                continue
+            if not sealed:
+                with open(path, "rb+") as f:
+                    data = f.read()
+                    if data and not data.endswith(b"\n"):
+                        f.truncate(data.rfind(b"\n") + 1)
+            opener = gzip.open if sealed else open
+            partitions[key] = self._entry(_read_jsonl(path, opener), sealed, os.path.getsize(path))
+            changed = True
+        if changed:
+            self._write_manifest()
+
+    def _seal_old(self):
+        """Compress every partition of a month that has ended."""
+        current = datetime.now().strftime("%Y-%m")
+        sealed = []
+        for key in self._keys():
+            entry = self._manifest["partitions"][key]
+            if key != UNDATED and key < current and not entry["sealed"]:
+                self._write_partition(key, self._read_partition(key), sealed=True)
+                sealed.append(key)
+        if sealed:
+            self._write_manifest()
+            print(f"[INFO] Sealed sales partitions: {', '.join(sealed)}")
+
+    def _unseal(self, key):
+        self._write_partition(key, self._read_partition(key), sealed=False)
+        self._write_manifest()
+
+    # ---------- Public API ----------
+    def signature(self, filename):
+        if filename not in self.PARTITIONED:
+            return super().signature(filename)
+        return (self._revisions.get(filename, 0), self._stat(self._manifest_path()))
+
+    def load(self, filename, default=None):
+        if filename not in self.PARTITIONED:
+            return super().load(filename, default)
+        with self._lock:
+            if not self._manifest["partitions"]:
+                return {} if default is None else default
+            records = []
+            for key in self._keys():
+                records.extend(self._read_partition(key))
+            return records if self._manifest["shape"] == "list" else {COLLECTIONS[filename]: records}
+
+    def save(self, filename, data):
+        """Replace all sales: unchanged months are kept, the rest rewritten in one logged commit."""
+        if filename not in self.PARTITIONED:
+            return super().save(filename, data)
+        uow = UnitOfWork(self)
+        uow.save(filename, data)
+        self.commit(uow)
+
+    def iter_sales(self, newest_first=False):
+        """Sales month by month; only one partition is held in memory at a time."""
+        with self._lock:
+            keys = self._keys()
+        if newest_first:
+            keys.reverse()
+        for key in keys:
+            with self._lock:
+                if key not in self._manifest["partitions"]:
+                    continue  # dropped meanwhile
+                records = self._read_partition(key)
+            yield from reversed(records) if newest_first else records
+
+    def sales_between(self, start="", end=""):
+        """
+        Sales dated from `start` through `end`, reading only the months the
+        manifest says can match, one month at a time.
+        """
+        with self._lock:
+            keys = [key for key in self._keys() if self._may_hold(key, start, end)]
+        for key in keys:
+            with self._lock:
+                if key not in self._manifest["partitions"]:
+                    continue  # dropped meanwhile
+                records = self._read_partition(key)
+            for record in records:
+                if in_date_range(record.get("date", ""), start, end):
+                    yield record
+
+    def page_sales(self, before=None, limit=PAGE_SIZE, product="", date=""):
+        """
+        One page of the transaction history (see JsonStorage.page_sales),
+        reading months newest first and stopping at the first month too old
+        to reach the page.
+        """
+        before = tuple(before) if before is not None else None
+        prefix = date_prefix(date)
+        with self._lock:
+            keys = [key for key in self._keys() if self._may_hold(key, prefix, prefix)]
+        if before is not None:
+            keys = [key for key in keys if key == UNDATED or key <= before[0][:7]]
+        # Undated sales can sort anywhere, so they are always candidates
+        keys.sort(key=lambda key: (key == UNDATED, key), reverse=True)
+        page = []
+        for key in keys:
+            if len(page) == limit and key != UNDATED and sale_key(page[-1]) > (key + "\uffff",):
+                break  # every sale of this month and older ones sorts below the page
+            with self._lock:
+                if key not in self._manifest["partitions"]:
+                    continue  # dropped meanwhile
+                records = self._read_partition(key)
+            page = page_of(chain(page, records), before, limit, product, date)
+        return page
+
+    def _may_hold(self, key, start, end):
+        if key == UNDATED:
+            return True
+        entry = self._manifest["partitions"][key]
+        if start and (key < start[:7] or entry["last"] < start):
+            return False
+        if end and (key[:len(end)] > end[:7] or entry["first"][:len(end)] > end):
+            return False
+        return True
+
+    def update_record(self, filename, record):
+        """Rewrite only the month holding the record (KeyError if no record has its id)."""
+        if filename not in self.PARTITIONED:
+            return super().update_record(filename, record)
+        with self._lock:
+            self._checkpoint()
+            key = partition_key(record)
+            keys = [key] + [k for k in self._keys() if k != key]
+            for k in keys:
+                if k not in self._manifest["partitions"]:
+                    continue
+                records = self._read_partition(k)
+                for i, existing in enumerate(records):
+                    if existing.get("id") != record["id"]:
+                        continue
+                    if k != key:
+                        return super().update_record(filename, record)  # date moved to another month
+                    records[i] = record
+                    self._write_partition(k, records, self._manifest["partitions"][k]["sealed"])
+                    self._write_manifest()
+                    self._touch(filename)
+                    return
+            raise KeyError(record["id"])
+
+    def export_json(self, dest_dir=None):
+        """Also refresh transactions.json in the data folder from the partitions."""
+        dest_dir = dest_dir or self.data_dir
+        if dest_dir == self.data_dir and self.fmt != "binary":
+            return _export_json(self, dest_dir, self.PARTITIONED)
+        _export_json(self, dest_dir)
+
+    # ---------- Transactions ----------
+    def _replace_doc(self, filename, data, sync=True):
+        if filename not in self.PARTITIONED:
+            return super()._replace_doc(filename, data, sync)
+        self._write_partitions(data, sync)
+
+    def _write_partitions(self, data, sync):
+        records = data if isinstance(data, list) else (data or {}).get(COLLECTIONS["transactions.json"], [])
+        groups = {}
+        for record in records:
+            groups.setdefault(partition_key(record), []).append(record)
+        current = datetime.now().strftime("%Y-%m")
+        partitions = self._manifest["partitions"]
+        for key, group in groups.items():
+            if key in partitions and partitions[key]["count"] == len(group) \
+                    and self._read_partition(key) == group:
+                continue  # month unchanged
+            sealed = key != UNDATED and key < current
+            self._write_partition(key, group, sealed, sync)
+        for key in set(partitions) - set(groups):
+            self._drop_partition(key)
+        self._manifest["shape"] = "list" if isinstance(data, list) else "dict"
+        self._write_manifest()
+        self._touch("transactions.json")
+
+    def _holds(self, filename, record):
+        if filename not in self.PARTITIONED:
+            return super()._holds(filename, record)
+        key = partition_key(record)
+        if key not in self._manifest["partitions"]:
+            return False
+        return _contains(self._read_partition(key), record)
+
+    def _append_line(self, filename, record, sync):
+        key = partition_key(record)
+        partitions = self._manifest["partitions"]
+        entry = partitions.get(key)
+        if entry is None and key != UNDATED:
+            self._seal_old()    # first sale of a new month closes the earlier ones
+        elif entry and entry["sealed"]:
+            self._unseal(key)   # back-dated sale into a closed month
+
+        path = self.partition_path(key)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            if sync:
+                f.flush()
+                os.fsync(f.fileno())
+            size = f.tell()
+        entry = partitions.setdefault(key, self._entry([], False, 0))
+        date = record.get("date", "")
+        entry["first"] = min(entry["first"], date) if entry["count"] else date
+        entry["last"] = max(entry["last"], date)
+        entry["count"] += 1
+        entry["bytes"] = size
+        self._write_manifest()
+        self._touch(filename)
+
+    def append(self, filename, record):
+        """Append one sale as a line of its month's partition."""
+        if filename not in self.PARTITIONED:
+            return super().append(filename, record)
+        with self._lock:
+            self._checkpoint()
+            self._append_line(filename, record, sync=True)
+
+
+# -------------------- SQLite Engine --------------------
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS products (
+    name     TEXT PRIMARY KEY,
+    price    REAL,
+    quantity INTEGER,
+    body     TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sales (
+    id        INTEGER PRIMARY KEY,
+    record_id TEXT,
+    buyer     TEXT,
+    product   TEXT,
+    date      TEXT,
+    body      TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS debts (
+    id        INTEGER PRIMARY KEY,
+    record_id TEXT,
+    buyer     TEXT,
+    product   TEXT,
+    date      TEXT,
+    debt      REAL,
+    body      TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS payments (
+    id      INTEGER PRIMARY KEY,
+    debt_id INTEGER NOT NULL REFERENCES debts(id) ON DELETE CASCADE,
+    date    TEXT,
+    paid    REAL,
+    body    TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sales_buyer ON sales(buyer);
+CREATE INDEX IF NOT EXISTS idx_sales_product ON sales(product);
+CREATE INDEX IF NOT EXISTS idx_sales_date ON sales(date);
+CREATE INDEX IF NOT EXISTS idx_debts_buyer ON debts(buyer);
+CREATE INDEX IF NOT EXISTS idx_debts_product ON debts(product);
+CREATE INDEX IF NOT EXISTS idx_debts_date ON debts(date);
+CREATE INDEX IF NOT EXISTS idx_payments_debt ON payments(debt_id);
+"""
+
+# Created after _upgrade_schema() so databases from before record ids work too.
+RECORD_ID_INDEXES = """
+CREATE UNIQUE INDEX IF NOT EXISTS idx_sales_record ON sales(record_id);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_debts_record ON debts(record_id);
+CREATE INDEX IF NOT EXISTS idx_sales_page ON sales(COALESCE(date, ''), COALESCE(record_id, ''));
+"""
+
+TABLES = {
+    "goods.json": "products",
+    "transactions.json": "sales",
+    "debts.json": "debts",
+}
+
+
+class SQLiteStorage:
+    """
+    Embedded SQLite database (invoice.db) with indexed tables for products,
+    sales, debts and payments. Documents are rebuilt on load so callers see
+    the same shapes as the JSON engine, while single records are written
+    with one indexed insert/update.
+    """
+
+    name = "sqlite"
+    DATE_INDEXED = True
+    STREAM_BATCH = 200
+    DB_NAME = "invoice.db"
+
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+        os.makedirs(self.data_dir, exist_ok=True)
+        self._lock = threading.RLock()
+        self._writes = 0
+        self._conn = sqlite3.connect(self.path(self.DB_NAME), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        # Python's lower(): SQLite's own only folds ASCII
+        self._conn.create_function("py_lower", 1, lambda text: (text or "").lower(), deterministic=True)
+        self._conn.executescript(SCHEMA)
+        self._upgrade_schema()
+        self._migrate_json()
+
+    def path(self, filename):
+        return os.path.join(self.data_dir, filename)
+
+    # ---------- Migration ----------
+    def _upgrade_schema(self):
+        for table in ("sales", "debts"):
+            columns = [row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")]
+            if "record_id" not in columns:
+                self._conn.execute(f"ALTER TABLE {table} ADD COLUMN record_id TEXT")
+        self._conn.executescript(RECORD_ID_INDEXES)
+
+    def _migrate_json(self):
+        """Import existing JSON files the first time the database is opened."""
+        if self._meta("migrated"):
+            return
+        legacy = JsonStorage(self.data_dir, "binary")  # reads <name>.ivb, else <name>.json
+        with self._lock, self._conn:
+            for filename in TABLES:
+                if not (os.path.exists(legacy.data_path(filename)) or os.path.exists(legacy.path(filename))):
+                    continue
+                try:
+                    data = legacy.load(filename)
+                except CorruptDataError as e:
+                    print(f"[WARNING] Skipping corrupted {filename} during migration: {e}")
+                    continue
+                self._replace(filename, data)
+                print(f"[INFO] Migrated {filename} into {self.DB_NAME}")
+            self._set_meta("migrated", "1")
+
+    def _meta(self, key):
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        self._conn.execute(
+            "INSERT INTO meta (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, value),
+        )
+
+    # ---------- Row helpers ----------
+    def _insert_product(self, name, product):
+        self._conn.execute(
+            "INSERT INTO products (name, price, quantity, body) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET price = excluded.price, "
+            "quantity = excluded.quantity, body = excluded.body",
+            (name, product.get("price"), product.get("quantity"), json.dumps(product, ensure_ascii=False)),
+        )
+
+    def _insert_sale(self, record):
+        self._conn.execute(
+            "INSERT INTO sales (record_id, buyer, product, date, body) VALUES (?, ?, ?, ?, ?)",
+            (record.get("id"), buyer_of(record), record.get("product"), record.get("date"),
+             json.dumps(record, ensure_ascii=False)),
+        )
+
+    def _debt_row(self, record):
+        """Column values of a debt (payment history goes to the payments table)."""
+        history = record.get("history") or []
+        body = {k: v for k, v in record.items() if not (k == "history" and history)}
+        return (record.get("id"), buyer_of(record), record.get("product"), record.get("date"),
+                record.get("debt", record.get("amount_owed")), json.dumps(body, ensure_ascii=False)), history
+
+    def _insert_payments(self, debt_id, history):
+        self._conn.executemany(
+            "INSERT INTO payments (debt_id, date, paid, body) VALUES (?, ?, ?, ?)",
+            [(debt_id, h.get("date"), h.get("paid"), json.dumps(h, ensure_ascii=False)) for h in history],
+        )
+
+    def _insert_debt(self, record):
+        row, history = self._debt_row(record)
+        cur = self._conn.execute(
+            "INSERT INTO debts (record_id, buyer, product, date, debt, body) VALUES (?, ?, ?, ?, ?, ?)", row
+        )
+        self._insert_payments(cur.lastrowid, history)
+
+    def _update(self, filename, record):
+        table = TABLES[filename]
+        found = self._conn.execute(
+            f"SELECT id FROM {table} WHERE record_id = ?", (record["id"],)
+        ).fetchone()
+        if found is None:
+            raise KeyError(record["id"])
+        if table == "sales":
+            self._conn.execute(
+                "UPDATE sales SET buyer = ?, product = ?, date = ?, body = ? WHERE id = ?",
+                (buyer_of(record), record.get("product"), record.get("date"),
+                 json.dumps(record, ensure_ascii=False), found[0]),
+            )
+            return
+        row, history = self._debt_row(record)
+        self._conn.execute(
+            "UPDATE debts SET buyer = ?, product = ?, date = ?, debt = ?, body = ? WHERE id = ?",
+            row[1:] + (found[0],),
+        )
+        self._conn.execute("DELETE FROM payments WHERE debt_id = ?", (found[0],))
+        self._insert_payments(found[0], history)
+
+    def _insert(self, filename, record):
+        if filename == "transactions.json":
+            self._insert_sale(record)
+        else:
+            self._insert_debt(record)
+
+    def _replace(self, filename, data):
+        table = TABLES[filename]
+        if table == "debts":
+            self._conn.execute("DELETE FROM payments")
+        self._conn.execute(f"DELETE FROM {table}")
+        if table == "products":
+            for name, product in (data or {}).items():
+                self._insert_product(name, product)
+            return
+        self._set_meta(f"shape:{filename}", "list" if isinstance(data, list) else "dict")
+        for record in records_of(data if isinstance(data, list) else dict(data or {}), filename):
+            self._insert(filename, record)
+
+    # ---------- Public API ----------
+    def signature(self, filename):
+        """Own write count plus PRAGMA data_version, which moves on commits from other connections."""
+        with self._lock:
+            return (self._writes, self._conn.execute("PRAGMA data_version").fetchone()[0])
+
+    def load(self, filename, default=None):
+        if filename not in TABLES:
+            raise ValueError(f"Unknown data file: {filename}")
+        with self._lock:
+            table = TABLES[filename]
+            if table == "products":
+                rows = self._conn.execute("SELECT name, body FROM products ORDER BY rowid").fetchall()
+                if not rows:
+                    return {} if default is None else default
+                return {name: json.loads(body) for name, body in rows}
+
+            rows = self._conn.execute(f"SELECT id, body FROM {table} ORDER BY id").fetchall()
+            shape = self._meta(f"shape:{filename}")
+            if not rows and shape is None:
+                return {} if default is None else default
+            records = []
+            by_id = {}
+            for row_id, body in rows:
+                record = json.loads(body)
+                by_id[row_id] = record
+                records.append(record)
+            if table == "debts":
+                for debt_id, body in self._conn.execute(
+                    "SELECT debt_id, body FROM payments ORDER BY id"
+                ):
+                    by_id[debt_id].setdefault("history", []).append(json.loads(body))
+            return records if shape == "list" else {COLLECTIONS[filename]: records}
+
+    def save(self, filename, data):
+        if filename not in TABLES:
+            raise ValueError(f"Unknown data file: {filename}")
+        with self._lock, self._conn:
+            self._writes += 1
+            self._replace(filename, data)
+
+    def iter_sales(self, newest_first=False):
+        """Sales in batches of STREAM_BATCH rows, walking the primary key."""
+        order, after = ("DESC", "<") if newest_first else ("ASC", ">")
+        last = None
+        while True:
+            with self._lock:
+                if last is None:
+                    rows = self._conn.execute(
+                        f"SELECT id, body FROM sales ORDER BY id {order} LIMIT ?", (self.STREAM_BATCH,)
+                    ).fetchall()
+                else:
+                    rows = self._conn.execute(
+                        f"SELECT id, body FROM sales WHERE id {after} ? ORDER BY id {order} LIMIT ?",
+                        (last, self.STREAM_BATCH),
+                    ).fetchall()
+            if not rows:
+                return
+            for _, body in rows:
+                yield json.loads(body)
+            last = rows[-1][0]
+
+    def sales_by_date(self, prefix=""):
+        """Sales whose date starts with `prefix`, as a range scan on idx_sales_date."""
+        return self.sales_between(prefix, prefix)
+
+    def sales_between(self, start="", end=""):
+        """Sales dated from `start` through `end`, in batches of STREAM_BATCH rows of the date range."""
+        where = ["id > ?"]
+        args = [start] if start else []
+        if start:
+            where.append("date >= ?")
+        if end:
+            where.append("date < ?")
+            args.append(end + "\uffff")
+        query = f"SELECT id, body FROM sales WHERE {' AND '.join(where)} ORDER BY id LIMIT ?"
+        last = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(query, [last] + args + [self.STREAM_BATCH]).fetchall()
+            if not rows:
+                return
+            for _, body in rows:
+                yield json.loads(body)
+            last = rows[-1][0]
+
+    def page_sales(self, before=None, limit=PAGE_SIZE, product="", date=""):
+        """One page of the transaction history (see JsonStorage.page_sales), walking idx_sales_page."""
+        where, args = [], []
+        if before is not None:
+            where.append("(COALESCE(date, ''), COALESCE(record_id, '')) < (?, ?)")
+            args.extend(before)
+        prefix = date_prefix(date)
+        if prefix:
+            where.append("COALESCE(date, '') >= ? AND COALESCE(date, '') < ?")
+            args.extend((prefix, prefix + "\uffff"))
+        elif date:
+            where.append("instr(COALESCE(date, ''), ?) > 0")
+            args.append(date)
+        if product:
+            where.append("instr(py_lower(product), ?) > 0")
+            args.append(product.lower())
+        query = "SELECT body FROM sales"
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        query += " ORDER BY COALESCE(date, '') DESC, COALESCE(record_id, '') DESC LIMIT ?"
+        with self._lock:
+            rows = self._conn.execute(query, args + [limit]).fetchall()
+        return [json.loads(body) for (body,) in rows]
+
+    def append(self, filename, record):
+        """Add one record to a collection: a single indexed insert."""
+        if filename not in COLLECTIONS:
+            raise ValueError(f"Not a collection file: {filename}")
+        with self._lock, self._conn:
+            self._writes += 1
+            self._insert(filename, record)
+
+    def put_product(self, name, product):
+        with self._lock, self._conn:
+            self._writes += 1
+            self._insert_product(name, product)
+
+    def update_record(self, filename, record):
+        """Rewrite the one row (and its payments) whose record id matches."""
+        with self._lock, self._conn:
+            self._writes += 1
+            self._update(filename, record)
+
+    def transaction(self):
+        return UnitOfWork(self)
+
+    def commit(self, uow):
+        """Apply a unit of work as one SQLite transaction."""
+        with self._lock, self._conn:
+            self._writes += 1
+            for filename, data in uow.saves.items():
+                self._replace(filename, data)
+            for name, product in uow.products.items():
+                self._insert_product(name, product)
+            for filename, record in uow.appends:
+                self._insert(filename, record)
+            for filename, record in uow.updates:
+                self._update(filename, record)
+
+    def meta(self, key):
+        """A value stored with set_meta(), or None (kept in the meta table)."""
+        with self._lock:
+            return self._meta(key)
+
+    def set_meta(self, key, value):
+        with self._lock, self._conn:
+            self._set_meta(key, value)
+
+    def export_json(self, dest_dir=None):
+        """Write pretty JSON copies of every dataset for humans."""
+        _export_json(self, dest_dir or self.data_dir)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _export_json(storage, dest_dir, datasets=DATASETS):
+    os.makedirs(dest_dir, exist_ok=True)
+    for filename in datasets:
+        path = os.path.join(dest_dir, filename)
+        with open(f"{path}.tmp", "wb") as f:
+            f.write(codec.encode(storage.load(filename, {}), "pretty"))
+        os.replace(f"{path}.tmp", path)
+
+
+# -------------------- Engine Registry --------------------
+ENGINES = {
+    JsonStorage.name: JsonStorage,
+    JournalStorage.name: JournalStorage,
+    PartitionedStorage.name: PartitionedStorage,
+    SQLiteStorage.name: SQLiteStorage,
+}
+
+
+SETTINGS_FILE = "storage.json"
+
+
+def _read_settings(data_dir):
+    try:
+        with open(os.path.join(data_dir, SETTINGS_FILE), encoding="utf-8") as f:
+            settings = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return settings if isinstance(settings, dict) else {}
+
+
+def _write_settings(data_dir, settings):
+    path = os.path.join(data_dir, SETTINGS_FILE)
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(settings, f, indent=4)
+    os.replace(f"{path}.tmp", path)
+
+
+def _detect_engine(data_dir):
+    """The engine whose files are already in a folder without settings, else DEFAULT_ENGINE."""
+    if os.path.exists(os.path.join(data_dir, SQLiteStorage.DB_NAME)):
+        return SQLiteStorage.name
+    if os.path.exists(os.path.join(data_dir, PartitionedStorage.PARTITION_DIR, PartitionedStorage.MANIFEST)):
+        return PartitionedStorage.name
+    if glob.glob(os.path.join(data_dir, "transactions.jsonl*")):  # journal, or one rotated by a fold
+        return JournalStorage.name
+    # Plain JSON files (or nothing yet): SQLite imports them on first open
+    return DEFAULT_ENGINE
+
+
+def open_storage(data_dir, engine=None, fmt=None):
+    """
+    Open the storage engine for a data folder.
+    The engine comes from the argument, $INVOICEAPP_STORAGE, the folder's
+    settings file (storage.json), then the files already there, falling
+    back to DEFAULT_ENGINE; the file format of the JSON engines from the
+    argument, $INVOICEAPP_FORMAT, the settings file, then DEFAULT_FORMAT.
+    The choice is written back to storage.json, so the folder keeps its
+    engine on devices where nothing sets the environment (Android).
+    """
+    settings = _read_settings(data_dir)
+    engine = engine or os.environ.get("INVOICEAPP_STORAGE") or settings.get("engine") or _detect_engine(data_dir)
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown storage engine: {engine}")
+    cls = ENGINES[engine]
+    chosen = {"engine": engine}
+    if issubclass(cls, JsonStorage):
+        storage = cls(data_dir, fmt or os.environ.get("INVOICEAPP_FORMAT") or settings.get("format"))
+        chosen["format"] = storage.fmt
+    else:
+        storage = cls(data_dir)
+    if chosen != settings:
+        _write_settings(data_dir, chosen)
+    return storage
@@ -0,0 +1,120 @@
+"""
+Downscaled product thumbnails, made off the UI thread.
+
+    app.thumbnails.request(image_path, lambda texture: setattr(img, "texture", texture))
+
+  memory  textures kept in an LRU bounded by a byte budget; a hit calls
+          back at once
+  disk    PNG thumbnails in the cache folder, named after the photo's path,
+          mtime and size, so an edited photo gets a new thumbnail
+  worker  PIL opens, orients and scales the photo (or reads the disk copy)
+          in a thread pool; the texture is made on the main thread via
+          Clock.schedule_once, since GL calls must happen there
+"""
+import os
+import hashlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from kivy.clock import Clock
+from kivy.graphics.texture import Texture
+
+THUMB_SIZE = (160, 160)
+MEMORY_BUDGET = 16 * 1024 * 1024    # bytes of RGBA pixels kept as textures
+WORKERS = 2
+
+
+class ThumbnailCache:
+    def __init__(self, cache_dir, size=THUMB_SIZE, memory_budget=MEMORY_BUDGET, workers=WORKERS):
+        self.cache_dir = cache_dir
+        self.size = size
+        self.memory_budget = memory_budget
+        self._textures = OrderedDict()  # key -> (texture, bytes)
+        self._bytes = 0
+        self._pending = {}  # key -> callbacks waiting for the worker
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="thumbnails")
+
+    # -------------------- Keys --------------------
+    def key(self, path):
+        """(path, mtime, size) of a photo, or None if it is missing."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return (path, st.st_mtime_ns, st.st_size)
+
+    def cache_path(self, key):
+        name = f"{key[0]}|{key[1]}|{key[2]}|{self.size[0]}x{self.size[1]}"
+        return os.path.join(self.cache_dir, hashlib.sha1(name.encode("utf-8")).hexdigest() + ".png")
+
+    # -------------------- Public API --------------------
+    def request(self, path, callback):
+        """
+        Call callback(texture) on the main thread once the thumbnail of
+        `path` is ready. Returns True when it was in memory and the callback
+        already ran; missing or unreadable photos never call back.
+        """
+        key = self.key(path) if path else None
+        if key is None:
+            return False
+        cached = self._textures.get(key)
+        if cached:
+            self._textures.move_to_end(key)
+            callback(cached[0])
+            return True
+        if key in self._pending:
+            self._pending[key].append(callback)
+            return False
+        self._pending[key] = [callback]
+        self._executor.submit(self._load, key)
+        return False
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # -------------------- Worker --------------------
+    def _load(self, key):
+        try:
+            result = self._decode(key)
+        except Exception as e:
+            print(f"[WARNING] Could not make thumbnail for {key[0]}: {e}")
+            result = None
+        Clock.schedule_once(lambda dt: self._deliver(key, result))
+
+    def _decode(self, key):
+        from PIL import Image as PILImage, ImageOps  # only the workers need PIL
+
+        cached = self.cache_path(key)
+        if os.path.exists(cached):
+            img = PILImage.open(cached)
+        else:
+            img = PILImage.open(key[0])
+            img.draft("RGB", self.size)         # JPEG: decode straight at a reduced scale
+            img = ImageOps.exif_transpose(img)  # phone photos carry their rotation in EXIF
+            img.thumbnail(self.size)
+            img = img.convert("RGBA")
+            os.makedirs(self.cache_dir, exist_ok=True)
+            img.save(f"{cached}.tmp", "PNG")
+            os.replace(f"{cached}.tmp", cached)
+        img = img.convert("RGBA")
+        return img.size, img.tobytes()
+
+    # -------------------- Main Thread --------------------
+    def _deliver(self, key, result):
+        callbacks = self._pending.pop(key, [])
+        if result is None:
+            return
+        size, pixels = result
+        texture = Texture.create(size=size, colorfmt="rgba")
+        texture.blit_buffer(pixels, colorfmt="rgba", bufferfmt="ubyte")
+        texture.flip_vertical()
+        self._remember(key, texture, len(pixels))
+        for callback in callbacks:
+            callback(texture)
+
+    def _remember(self, key, texture, nbytes):
+        self._textures[key] = (texture, nbytes)
+        self._bytes += nbytes
+        while self._bytes > self.memory_budget and len(self._textures) > 1:
+            _, (_, dropped) = self._textures.popitem(last=False)
+            self._bytes -= dropped
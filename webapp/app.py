@@ -1,34 +1,171 @@
-from flask import Flask, jsonify, request, render_template
+from flask import Flask, Response, jsonify, request, render_template
 from flask_cors import CORS
-import json
 import os
+import gzip
+import hashlib
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+# Installed from the project root (see requirements.txt)
+from utils.storage import COLLECTIONS, open_storage, ensure_ids, new_id
+from utils.products import ProductIndex
+from webapp.store import SharedStore
+from webapp.listing import (
+    Filters, RecordIndex, sale_outstanding, debt_outstanding,
+    EXPORT_FORMATS, SALE_COLUMNS, DEBT_COLUMNS, export_rows,
+)
+
+# --- PATH CONFIGURATION ---
+GZIP_MIN_BYTES = 1024  # smaller bodies are sent as they are
+PAGE_CACHE = 64        # encoded list pages kept per collection and generation
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "data")
 
 app = Flask(__name__)
 CORS(app)  # Allow frontend access (e.g., React, HTML, etc.)
 
-# --- PATH CONFIGURATION ---
-BASE_DIR = os.path.dirname(__file__)
-DATA_DIR = os.path.join(BASE_DIR, "data")
+store = SharedStore(DATA_DIR, lambda: open_storage(DATA_DIR))
+storage = store.storage
+with store.write():
+    ensure_ids(storage)  # under the lock: the first worker to boot backfills, the rest find it done
 
 
 # --- HELPER FUNCTIONS ---
 def load_json(filename):
-    """Safely load data from JSON file."""
-    path = os.path.join(DATA_DIR, filename)
-    if os.path.exists(path):
-        with open(path, "r") as f:
-            try:
-                return json.load(f)
-            except json.JSONDecodeError:
-                return {}
-    return {}
-
-
-def save_json(filename, data):
-    """Safely save dictionary or list data to JSON file."""
-    path = os.path.join(DATA_DIR, filename)
-    with open(path, "w") as f:
-        json.dump(data, f, indent=4)
+    """Current data from this worker's in-memory copy (no file read unless another worker wrote)."""
+    return store.get(filename)
+
+
+def find_product(goods, name):
+    """Return the goods key matching `name` (case/space/Unicode-insensitive), or None."""
+    index = store.derive("products", lambda s: ProductIndex(s.get("goods.json")))
+    return index.lookup(name)
+
+
+def _encode(payload, modified_at):
+    body = app.json.dumps(payload).encode("utf-8")
+    return {
+        "body": body,
+        "etag": hashlib.blake2b(body, digest_size=16).hexdigest(),
+        "modified": datetime.fromtimestamp(int(modified_at), timezone.utc),
+        "gzip": None,  # compressed on first use
+    }
+
+
+def cached_json(name, build):
+    """
+    JSON response serialised once per data generation and shared by
+    every request until the data changes. Clients sending the ETag back
+    (If-None-Match) or the Last-Modified time (If-Modified-Since) get a
+    bodiless 304 while their copy is current; bodies over GZIP_MIN_BYTES
+    are gzipped for clients that accept it.
+    """
+    return _respond(store.derive(f"response:{name}", lambda s: _encode(build(s), s.modified_at)))
+
+
+def _respond(entry):
+    body, etag = entry["body"], entry["etag"]
+    compress = len(body) >= GZIP_MIN_BYTES and "gzip" in request.accept_encodings
+    if compress:
+        if entry["gzip"] is None:
+            entry["gzip"] = gzip.compress(body, mtime=0)
+        body, etag = entry["gzip"], etag + "-gz"  # each encoding is its own representation
+
+    response = Response(body, mimetype="application/json")
+    response.set_etag(etag)
+    response.last_modified = entry["modified"]
+    response.vary.add("Accept-Encoding")
+    if compress:
+        response.headers["Content-Encoding"] = "gzip"
+    return response.make_conditional(request)
+
+
+def records(s, filename):
+    """The record list of a collection (the webapp keeps bare lists; app-layout files a keyed one)."""
+    doc = s.docs[filename]
+    return doc if isinstance(doc, list) else doc.get(COLLECTIONS[filename], [])
+
+
+def record_index(filename, outstanding):
+    """(RecordIndex of a collection, commit time of its data), built once per generation."""
+    return store.derive(
+        f"index:{filename}", lambda s: (RecordIndex(records(s, filename), outstanding), s.modified_at)
+    )
+
+
+def list_page(filename, outstanding):
+    """
+    One page of a collection from its per-generation RecordIndex (see
+    webapp/listing.py for the filters), as a conditional JSON response.
+    Encoded pages are kept per generation and parsed query, the
+    PAGE_CACHE most recent ones, so a repeated request (above all the
+    unfiltered first page) is not serialised, hashed or gzipped again.
+    """
+    try:
+        filters = Filters.from_args(request.args)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)})
+    pages = store.derive(f"pages:{filename}", lambda s: OrderedDict())
+    entry = pages.get(filters)
+    if entry is None:
+        index, modified_at = record_index(filename, outstanding)
+        page, next_cursor = index.page(filters)
+        payload = {"status": "success", "data": page, "next_cursor": next_cursor}
+        entry = pages[filters] = _encode(payload, modified_at)
+        if len(pages) > PAGE_CACHE:
+            pages.popitem(last=False)
+    else:
+        pages.move_to_end(filters)
+    return _respond(entry)
+
+
+def record_sale(tx, goods, product, customer, qty, amount_paid, date=None):
+    """Take `qty` of `product` off the stock and add the sale (and its debt, if unpaid) on `tx`."""
+    total_price = goods[product]["price"] * qty
+    goods[product]["quantity"] -= qty
+    tx.put_product(product, goods[product])
+
+    sale = {
+        "id": new_id(),
+        "date": date or datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "customer": customer,
+        "product": product,
+        "quantity": qty,
+        "total_price": total_price,
+        "amount_paid": amount_paid,
+        "debt": total_price - amount_paid
+    }
+    tx.append("transactions.json", sale)
+
+    if amount_paid < total_price:
+        tx.append("debts.json", {
+            "id": new_id(),
+            "sale_id": sale["id"],
+            "date": sale["date"],
+            "customer": customer,
+            "product": product,
+            "amount_owed": total_price - amount_paid
+        })
+    return sale
+
+
+def export_response(name, filename, outstanding, columns):
+    """
+    Every record of a collection passing the list filters, streamed as
+    NDJSON (?format=ndjson, the default) or CSV (?format=csv). Rows are
+    produced as the response is sent, from the generation's RecordIndex.
+    """
+    fmt = request.args.get("format", "ndjson")
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"status": "error", "message": f"format must be one of: {', '.join(EXPORT_FORMATS)}"})
+    try:
+        filters = Filters.from_args(request.args)._replace(cursor=None)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)})
+    index, _ = record_index(filename, outstanding)
+    response = Response(export_rows(index, filters, fmt, columns), mimetype=EXPORT_FORMATS[fmt])
+    response.headers["Content-Disposition"] = f'attachment; filename="{name}.{fmt}"'
+    return response
 
 
 # --- HOME ROUTE ---
@@ -40,9 +177,8 @@ def home():
 # --- GOODS ROUTES ---
 @app.route("/api/goods", methods=["GET"])
 def api_get_goods():
-    """Fetch all goods."""
-    goods = load_json("goods.json")
-    return jsonify({"status": "success", "data": goods})
+    """Fetch all goods (conditional and gzip-aware, see cached_json)."""
+    return cached_json("goods", lambda s: {"status": "success", "data": s.docs["goods.json"]})
 
 
 @app.route("/api/restock", methods=["POST"])
@@ -50,19 +186,21 @@ def api_restock():
     """Add new quantity and price to an existing product."""
     try:
         data = request.json
-        goods = load_json("goods.json")
-
         name = data.get("name")
         qty = int(data.get("quantity", 0))
         new_price = float(data.get("price", 0))
 
-        if name not in goods:
-            return jsonify({"status": "error", "message": f"Product '{name}' not found"})
+        with store.write() as tx:
+            goods = load_json("goods.json")
+            key = find_product(goods, name)
+            if key is None:
+                return jsonify({"status": "error", "message": f"Product '{name}' not found"})
+            name = key
 
-        # Update quantity and price
-        goods[name]["quantity"] += qty
-        goods[name]["price"] = new_price
-        save_json("goods.json", goods)
+            # Update quantity and price
+            goods[name]["quantity"] += qty
+            goods[name]["price"] = new_price
+            tx.put_product(name, goods[name])
 
         return jsonify({"status": "success", "message": f"Restocked {qty} units of {name}"})
 
@@ -76,97 +214,168 @@ def api_record_sale():
     """Record a sale transaction and update stock."""
     try:
         data = request.json
-        goods = load_json("goods.json")
-        transactions = load_json("transactions.json")
-        debts = load_json("debts.json")
-
         customer = data.get("customer")
         product = data.get("product")
         qty = int(data.get("quantity", 0))
         amount_paid = float(data.get("amount_paid", 0))
 
-        if product not in goods:
-            return jsonify({"status": "error", "message": f"Product '{product}' not found"})
+        # Stock check and update happen under the cross-worker lock, so no sale is oversold
+        with store.write() as tx:
+            goods = load_json("goods.json")
+            key = find_product(goods, product)
+            if key is None:
+                return jsonify({"status": "error", "message": f"Product '{product}' not found"})
+            product = key
 
-        if goods[product]["quantity"] < qty:
-            return jsonify({"status": "error", "message": f"Not enough stock for '{product}'"})
+            if goods[product]["quantity"] < qty:
+                return jsonify({"status": "error", "message": f"Not enough stock for '{product}'"})
 
-        total_price = goods[product]["price"] * qty
-        goods[product]["quantity"] -= qty
+            record_sale(tx, goods, product, customer, qty, amount_paid)
 
-        # Record transaction
-        sale = {
-            "customer": customer,
-            "product": product,
-            "quantity": qty,
-            "total_price": total_price,
-            "amount_paid": amount_paid,
-            "debt": total_price - amount_paid
-        }
-        if isinstance(transactions, list):
-            transactions.append(sale)
-        else:
-            transactions = [sale]
-
-        # Record debts if needed
-        if amount_paid < total_price:
-            debt_entry = {
-                "customer": customer,
-                "product": product,
-                "amount_owed": total_price - amount_paid
-            }
-            if isinstance(debts, list):
-                debts.append(debt_entry)
-            else:
-                debts = [debt_entry]
+        return jsonify({"status": "success", "message": f"Sale recorded for {customer}"})
 
-        # Save updated data
-        save_json("transactions.json", transactions)
-        save_json("debts.json", debts)
-        save_json("goods.json", goods)
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)})
 
-        return jsonify({"status": "success", "message": f"Sale recorded for {customer}"})
+
+@app.route("/api/sales/batch", methods=["POST"])
+def api_record_sales_batch():
+    """
+    Record a basket in one commit:
+        {"customer": "...", "amount_paid": 0,
+         "items": [{"product": "...", "quantity": 2, "amount_paid": 0, "customer": "..."}]}
+    Lines without their own amount_paid share the top-level one, in order;
+    what is left of it once their totals are covered comes back as
+    "change". All lines are checked against the stock together (a product may
+    appear twice); if any is rejected nothing is recorded.
+    """
+    try:
+        data = request.json or {}
+        items = data.get("items")
+        if not isinstance(items, list) or not items:
+            return jsonify({"status": "error", "message": "items must be a non-empty list"})
+        paid_left = float(data.get("amount_paid", 0))
+        if paid_left < 0:
+            return jsonify({"status": "error", "message": "amount_paid must not be negative"})
+
+        with store.write() as tx:
+            goods = load_json("goods.json")
+            lines, results, wanted = [], [], {}
+            for number, item in enumerate(items):
+                try:
+                    name = item.get("product")
+                    qty = int(item.get("quantity", 0))
+                    paid = item.get("amount_paid")
+                    paid = float(paid) if paid is not None else None
+                except (AttributeError, TypeError, ValueError):
+                    results.append({"line": number, "status": "error", "message": "Invalid line item"})
+                    continue
+                product = find_product(goods, name)
+                if product is None:
+                    results.append({"line": number, "status": "error", "message": f"Product '{name}' not found"})
+                    continue
+                if qty <= 0:
+                    results.append({"line": number, "status": "error", "message": "Quantity must be positive"})
+                    continue
+                wanted[product] = wanted.get(product, 0) + qty
+                lines.append((number, item.get("customer", data.get("customer")), product, qty, paid))
+                results.append({"line": number, "status": "ok", "product": product, "quantity": qty})
+
+            # Stock is checked per product over the whole basket
+            short = {p for p, qty in wanted.items() if goods[p]["quantity"] < qty}
+            for result in results:
+                if result.get("product") in short:
+                    result.update(status="error", message=f"Not enough stock for '{result['product']}'")
+            rejected = sum(1 for result in results if result["status"] == "error")
+            if rejected:
+                return jsonify({
+                    "status": "error",
+                    "message": f"No sale recorded: {rejected} of {len(items)} line(s) rejected",
+                    "results": results,
+                })
+
+            date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            for (number, customer, product, qty, paid), result in zip(lines, results):
+                total_price = goods[product]["price"] * qty
+                if paid is None:
+                    paid = min(paid_left, total_price)
+                    paid_left -= paid
+                sale = record_sale(tx, goods, product, customer, qty, paid, date)
+                result.update(sale_id=sale["id"], total_price=total_price, amount_paid=paid, debt=sale["debt"])
+
+        return jsonify({
+            "status": "success",
+            "message": f"{len(lines)} sale(s) recorded",
+            "results": results,
+            "stock": {product: goods[product]["quantity"] for product in wanted},
+            "change": paid_left,  # overpayment of the shared amount_paid, owed back to the customer
+        })
 
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)})
 
 
+@app.route("/api/transactions", methods=["GET"])
+def api_get_transactions():
+    """Fetch sales a page at a time, newest first (same parameters as /api/debts)."""
+    return list_page("transactions.json", sale_outstanding)
+
+
 # --- DEBT ROUTES ---
 @app.route("/api/debts", methods=["GET"])
 def api_get_debts():
-    """Fetch all debts."""
-    debts = load_json("debts.json")
-    return jsonify({"status": "success", "data": debts})
+    """Fetch debts a page at a time, newest first (?buyer=&product=&from=&to=&min_outstanding=&limit=&cursor=)."""
+    return list_page("debts.json", debt_outstanding)
 
 
 @app.route("/api/update_debt", methods=["POST"])
 def api_update_debt():
-    """Update a customer's debt payment."""
+    """Update a customer's debt payment (by debt "id", or by customer + product)."""
     try:
         data = request.json
+        debt_id = data.get("id")
         customer = data.get("customer")
         product = data.get("product")
         payment = float(data.get("payment", 0))
-        debts = load_json("debts.json")
 
-        updated = False
-        for debt in debts:
-            if debt["customer"] == customer and debt["product"] == product:
+        with store.write() as tx:
+            debts = load_json("debts.json")
+            if debt_id:
+                matches = [d for d in debts if d.get("id") == debt_id]
+            else:
+                matches = [d for d in debts if d["customer"] == customer and d["product"] == product]
+            if not matches:
+                return jsonify({"status": "error", "message": "Debt record not found"})
+
+            for debt in matches:
                 debt["amount_owed"] -= payment
                 if debt["amount_owed"] <= 0:
                     debt["amount_owed"] = 0
-                updated = True
 
-        if not updated:
-            return jsonify({"status": "error", "message": "Debt record not found"})
-
-        save_json("debts.json", debts)
+            if debt_id:
+                tx.update("debts.json", matches[0])  # exactly one record
+            else:
+                tx.save("debts.json", debts)
+        customer = matches[0].get("customer", customer)
         return jsonify({"status": "success", "message": f"Debt updated for {customer}"})
 
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)})
 
 
+# --- EXPORT ROUTES ---
+@app.route("/api/export/sales", methods=["GET"])
+def api_export_sales():
+    """Stream every sale, oldest first (?format=ndjson|csv plus the /api/transactions filters)."""
+    return export_response("sales", "transactions.json", sale_outstanding, SALE_COLUMNS)
+
+
+@app.route("/api/export/debts", methods=["GET"])
+def api_export_debts():
+    """Stream every debt, oldest first (?format=ndjson|csv plus the /api/debts filters)."""
+    return export_response("debts", "debts.json", debt_outstanding, DEBT_COLUMNS)
+
+
 # --- SERVER START ---
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000, debug=True)
@@ -0,0 +1,181 @@
+"""
+Indexed, cursor-paginated listings (and streamed exports) of the
+webapp's sales and debts.
+
+A RecordIndex is built once per data generation (SharedStore.derive) and
+answers every page request of that generation without scanning: records
+are sorted by (date, id), so a date range and a cursor are two bisects,
+and buyer/product filters walk only that name's own position list.
+
+    index = RecordIndex(debts, outstanding=debt_outstanding)
+    page, cursor = index.page(Filters.from_args(request.args))
+
+Pages run newest first. The cursor is the (date, id) of the last record
+of a page, encoded for URLs; the next page starts strictly below it, so
+records committed between two requests never shift a client's place.
+"""
+import io
+import csv
+import json
+import base64
+from bisect import bisect_left
+from collections import namedtuple
+
+from utils.products import normalize_key
+from utils.storage import buyer_of, sale_key
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+
+def sale_outstanding(record):
+    return record.get("debt") or 0
+
+
+def debt_outstanding(record):
+    return record.get("amount_owed", record.get("debt")) or 0
+
+
+# -------------------- Cursors --------------------
+def encode_cursor(key):
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    """The (date, id) key in a cursor (ValueError if it is not one of ours)."""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not (isinstance(key, list) and len(key) == 2 and all(isinstance(part, str) for part in key)):
+        raise ValueError("Invalid cursor")
+    return tuple(key)
+
+
+# -------------------- Filters --------------------
+class Filters(namedtuple("Filters", "buyer product start end min_outstanding limit cursor")):
+    """
+    Query parameters of the list endpoints: buyer (or customer) and
+    product match whole names in any case; from/to are inclusive date
+    prefixes (2025, 2025-08, 2025-08-03); min_outstanding keeps records
+    owing at least that much; limit is capped at MAX_LIMIT.
+    """
+
+    @classmethod
+    def from_args(cls, args):
+        """Parse request.args (ValueError with a readable message on bad input)."""
+        try:
+            limit = int(args.get("limit", DEFAULT_LIMIT))
+        except ValueError:
+            raise ValueError("limit must be a whole number") from None
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+        min_outstanding = args.get("min_outstanding")
+        if min_outstanding is not None:
+            try:
+                min_outstanding = float(min_outstanding)
+            except ValueError:
+                raise ValueError("min_outstanding must be a number") from None
+        cursor = args.get("cursor")
+        return cls(
+            buyer=args.get("buyer", args.get("customer", "")),
+            product=args.get("product", ""),
+            start=args.get("from", ""),
+            end=args.get("to", ""),
+            min_outstanding=min_outstanding,
+            limit=min(limit, MAX_LIMIT),
+            cursor=decode_cursor(cursor) if cursor else None,
+        )
+
+
+# -------------------- Index --------------------
+class RecordIndex:
+    def __init__(self, records, outstanding=sale_outstanding):
+        self.outstanding = outstanding
+        self.records = sorted(records, key=sale_key)   # oldest first
+        self.keys = [sale_key(record) for record in self.records]
+        self.by_buyer = {}      # normalised name -> positions, ascending
+        self.by_product = {}
+        for position, record in enumerate(self.records):
+            self.by_buyer.setdefault(normalize_key(buyer_of(record)), []).append(position)
+            self.by_product.setdefault(normalize_key(record.get("product")), []).append(position)
+
+    def span(self, start="", end="", before=None):
+        """Positions [lo, hi) of the records dated from `start` through `end` and below the `before` key."""
+        lo = bisect_left(self.keys, (start,)) if start else 0
+        hi = bisect_left(self.keys, (end + "\uffff",)) if end else len(self.keys)
+        if before is not None:
+            hi = min(hi, bisect_left(self.keys, before))
+        return lo, max(lo, hi)
+
+    def positions(self, filters, newest_first=True):
+        """Positions of the records passing `filters`, walking the narrowest index."""
+        lo, hi = self.span(filters.start, filters.end, filters.cursor)
+        candidates = []
+        if filters.buyer:
+            candidates.append(self.by_buyer.get(normalize_key(filters.buyer), []))
+        if filters.product:
+            candidates.append(self.by_product.get(normalize_key(filters.product), []))
+        if candidates:
+            chosen = min(candidates, key=len)
+            steps = range(bisect_left(chosen, lo), bisect_left(chosen, hi))
+        else:
+            chosen, steps = None, range(lo, hi)
+        for step in reversed(steps) if newest_first else steps:
+            position = chosen[step] if chosen is not None else step
+            if self._passes(self.records[position], filters):
+                yield position
+
+    def _passes(self, record, filters):
+        if filters.buyer and normalize_key(buyer_of(record)) != normalize_key(filters.buyer):
+            return False
+        if filters.product and normalize_key(record.get("product")) != normalize_key(filters.product):
+            return False
+        if filters.min_outstanding is not None and self.outstanding(record) < filters.min_outstanding:
+            return False
+        return True
+
+    def page(self, filters):
+        """(records of one page, cursor of the next page or None)."""
+        records, last = [], None
+        for position in self.positions(filters):
+            if len(records) == filters.limit:  # one more exists: the page continues below `last`
+                return records, encode_cursor(self.keys[last])
+            records.append(self.records[position])
+            last = position
+        return records, None
+
+
+# -------------------- Exports --------------------
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+SALE_COLUMNS = ["id", "date", "customer", "product", "quantity", "total_price", "amount_paid", "debt"]
+DEBT_COLUMNS = ["id", "sale_id", "date", "customer", "product", "amount_owed"]
+EXPORT_BATCH = 200  # records per chunk handed to the server
+
+
+def export_rows(index, filters, fmt, columns):
+    """
+    Yield the records passing `filters`, oldest first, as NDJSON lines or
+    CSV rows (`columns`, with a header), EXPORT_BATCH records per chunk.
+    Only one chunk is built at a time.
+    """
+    buffer = io.StringIO()
+    writer = None
+    if fmt == "csv":
+        writer = csv.DictWriter(buffer, columns, extrasaction="ignore")
+        writer.writeheader()
+    count = 0
+    for position in index.positions(filters, newest_first=False):
+        record = index.records[position]
+        if writer:
+            writer.writerow(dict(record, customer=buyer_of(record)))
+        else:
+            buffer.write(json.dumps(record, ensure_ascii=False))
+            buffer.write("\n")
+        count += 1
+        if count % EXPORT_BATCH == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
@@ -0,0 +1,212 @@
+"""
+In-memory state for the webapp, shared safely between gunicorn workers.
+
+Each worker keeps the parsed goods, transactions and debts in memory and
+serves reads from them. Writers take an exclusive fcntl lock on
+data/.webapp.lock, so read-modify-write cycles from different workers
+run one at a time, and bump a generation counter kept in a small
+memory-mapped file (data/.webapp.generation, with the commit time) after
+they commit. Every request compares that counter with the generation its
+worker has loaded, which costs a memory read and no system call; only
+when another worker has committed are the files read again.
+
+    with store.write() as tx:
+        goods = store.get("goods.json")
+        goods[name]["quantity"] -= qty
+        tx.put_product(name, goods[name])
+
+Changes staged on `tx` are applied to the worker's documents as well, so
+the writing worker never serves data older than its own commit.
+Documents from get() are shared by every request of the worker: change
+them only inside write(). The workers run on the json or sqlite engine
+only (others raise ValueError): the journal's compactor and the
+partitioned engine's manifest keep file state per process.
+"""
+import os
+import time
+import mmap
+import struct
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows dev server: a single process, the thread lock is enough
+    fcntl = None
+
+from utils.storage import DATASETS, CorruptDataError, UnitOfWork, records_of
+
+GENERATION = struct.Struct("<Qd")  # generation, time of its commit (Unix seconds)
+SHARED_ENGINES = ("json", "sqlite")  # engines that keep no per-process file state
+
+
+class SharedTransaction(UnitOfWork):
+    """A UnitOfWork that also applies each staged change to the worker's documents."""
+
+    def __init__(self, storage, docs):
+        super().__init__(storage)
+        self.docs = docs
+
+    def save(self, filename, data):
+        super().save(filename, data)
+        self.docs[filename] = data
+
+    def put_product(self, name, product):
+        super().put_product(name, product)
+        self.docs["goods.json"][name] = product
+
+    def append(self, filename, record):
+        doc = self.docs[filename]
+        if not doc and not isinstance(doc, list):  # fresh "{}" file: start a list and save it whole
+            self.save(filename, [record])
+            return
+        records_of(doc, filename).append(record)  # a bare list, or the app's {"sales": [...]}
+        if filename not in self.saves:  # else the staged whole document holds it
+            super().append(filename, record)
+
+    def update(self, filename, record):
+        super().update(filename, record)
+        records = records_of(self.docs[filename], filename)
+        for i, existing in enumerate(records):
+            if existing.get("id") == record["id"]:
+                records[i] = record
+                break
+
+    def staged(self):
+        """Files whose changes went through this transaction (and so are in the documents)."""
+        names = set(self.saves) | {filename for filename, _ in self.appends + self.updates}
+        if self.products:
+            names.add("goods.json")
+        return names
+
+
+class SharedStore:
+    """
+    `open_storage` is called with the exclusive lock held: opening an
+    engine replays a leftover commit log, which must not race with
+    another worker's commit in progress.
+    """
+
+    def __init__(self, data_dir, open_storage):
+        os.makedirs(data_dir, exist_ok=True)
+        self.lock_path = os.path.join(data_dir, ".webapp.lock")
+        self.generation_path = os.path.join(data_dir, ".webapp.generation")
+        self.generation = None   # generation of self.docs, None = not loaded
+        self.modified_at = 0.0   # Unix time that generation was committed
+        self.docs = {}
+        self._derived = {}       # name -> (generation, value)
+        self._lock = threading.RLock()
+        self._counter = self._map_generation()
+        with self._lock, self._file_lock(fcntl.LOCK_EX if fcntl else None):
+            self.storage = open_storage()
+        if self.storage.name not in SHARED_ENGINES:
+            self.storage.close()
+            raise ValueError(f"The webapp needs the json or sqlite engine, not {self.storage.name}")
+
+    # -------------------- Generation Counter --------------------
+    def _map_generation(self):
+        fd = os.open(self.generation_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            with self._file_lock(fcntl.LOCK_EX if fcntl else None):
+                if os.fstat(fd).st_size < GENERATION.size:
+                    os.ftruncate(fd, GENERATION.size)
+                counter = mmap.mmap(fd, GENERATION.size)
+                generation, committed_at = GENERATION.unpack_from(counter, 0)
+                if not committed_at:  # new file: date the data from now on, the same for every worker
+                    GENERATION.pack_into(counter, 0, generation, time.time())
+            return counter
+        finally:
+            os.close(fd)  # the mapping stays valid
+
+    def shared_generation(self):
+        """The generation last committed by any worker."""
+        return GENERATION.unpack_from(self._counter, 0)[0]
+
+    def _bump(self):
+        generation = self.shared_generation() + 1
+        self.modified_at = time.time()
+        # Shared mapping: other workers see it at once
+        GENERATION.pack_into(self._counter, 0, generation, self.modified_at)
+        return generation
+
+    # -------------------- Locking --------------------
+    @contextmanager
+    def _file_lock(self, operation):
+        if fcntl is None or operation is None:
+            yield
+            return
+        with open(self.lock_path, "a") as f:
+            fcntl.flock(f.fileno(), operation)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    # -------------------- Reads --------------------
+    def _refresh(self, shared_lock=True):
+        generation = self.shared_generation()
+        if generation == self.generation:
+            return
+        # A shared lock waits out a commit in progress, so all files are read at one generation
+        with self._file_lock(fcntl.LOCK_SH if fcntl and shared_lock else None):
+            generation, modified_at = GENERATION.unpack_from(self._counter, 0)
+            docs = {}
+            for filename in DATASETS:
+                try:
+                    docs[filename] = self.storage.load(filename, {})
+                except CorruptDataError as e:
+                    print(f"[WARNING] Corrupted data: {e}")
+                    docs[filename] = {}
+            self.docs = docs
+            self.generation = generation
+            self.modified_at = modified_at
+
+    def get(self, filename):
+        """The current document (read-only outside write())."""
+        with self._lock:
+            self._refresh()
+            return self.docs[filename]
+
+    def derive(self, name, build):
+        """A value computed from the documents, rebuilt once per generation."""
+        with self._lock:
+            self._refresh()
+            cached = self._derived.get(name)
+            if cached and cached[0] == self.generation:
+                return cached[1]
+            value = build(self)
+            self._derived[name] = (self.generation, value)
+            return value
+
+    # -------------------- Writes --------------------
+    @contextmanager
+    def write(self):
+        """
+        Serialised read-modify-write: holds the cross-process lock, brings
+        the documents up to date, and yields a SharedTransaction that is
+        committed when the block ends. If the block raises nothing is
+        written and the in-memory documents are read again, as they are
+        after writes made on the storage engine directly.
+        """
+        with self._lock, self._file_lock(fcntl.LOCK_EX if fcntl else None):
+            self._refresh(shared_lock=False)  # we already hold the exclusive lock
+            before = self._signatures()
+            try:
+                with SharedTransaction(self.storage, self.docs) as tx:
+                    yield tx
+            except BaseException:
+                self.generation = None  # documents may be half-changed
+                raise
+            after = self._signatures()
+            if after != before:  # a rejected request wrote nothing: no reload for the others
+                generation = self._bump()
+                staged = tx.staged()
+                # Written straight to storage, not through tx: the documents must be read back
+                direct = [f for f, old, new in zip(DATASETS, before, after) if old != new and f not in staged]
+                self.generation = None if direct else generation
+
+    def _signatures(self):
+        return [self.storage.signature(filename) for filename in DATASETS]
+
+    def close(self):
+        self._counter.close()